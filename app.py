@@ -1,24 +1,32 @@
 from PySide6 import QtCore
-from PySide6.QtCore import QThread, QTimer
+from PySide6.QtCore import QEvent, QThread, QTimer
 from lib.port import DisconnectException
 from datetime import datetime
 
 from ui.mainwindow_ui import Ui_MainWindow
-from lib.communication import TelemetryHandler, Port
+from lib.communication import AsyncTelemetryHandler, TelemetryHandler, Port
+from lib.discovery import discovery
 from lib.logger import logger
 from lib.chart import Chart
 from lib.rtc import RTC
-from lib.gearth import Coordinate, LoadDirectory
+from lib.metrics import Histogram, exportMetrics
+from lib.recorder import TelemetryRecorder
+from lib.schema import CONTAINER, CONTAINER_STATES, PAYLOAD
+from lib.store import INDEX, TelemetryStore
 import settings
 
 from PySide6 import QtWidgets
 from PySide6.QtWidgets import QFileDialog, QMainWindow
+import asyncio
 import sys
 import time
 import pyqtgraph as pg
 import os
 import paho.mqtt.client as mqtt
 
+# Read the radio from the Qt event loop through asyncio instead of a QThread
+USE_ASYNC_TELEMETRY = settings.TELEMETRY_TRANSPORT == 'asyncio' and AsyncTelemetryHandler.supported
+
 
 class App(QMainWindow):
 
@@ -42,30 +50,57 @@ class App(QMainWindow):
 
         # Initialize charts
         self.c_temp_chart = Chart(
-            self.ui.c_temp_chart, self.ui.c_temp_value, '°C')
+            self.ui.c_temp_chart, self.ui.c_temp_value, CONTAINER.unit('TEMP'))
         self.c_altitude_chart = Chart(
-            self.ui.c_altitude_chart, self.ui.c_altitude_value, 'm')
+            self.ui.c_altitude_chart, self.ui.c_altitude_value, CONTAINER.unit('ALTITUDE'))
         self.c_gps_altitude_chart = Chart(
-            self.ui.c_gps_altitude_chart, self.ui.c_gps_altitude_value, 'm')
+            self.ui.c_gps_altitude_chart, self.ui.c_gps_altitude_value, CONTAINER.unit('GPS_ALTITUDE'))
         self.c_voltage_chart = Chart(
-            self.ui.c_voltage_chart, self.ui.c_voltage_value, 'V')
+            self.ui.c_voltage_chart, self.ui.c_voltage_value, CONTAINER.unit('VOLTAGE'))
         self.p_temp_chart = Chart(
-            self.ui.p_temp_chart, self.ui.p_temp_value, '°C')
+            self.ui.p_temp_chart, self.ui.p_temp_value, PAYLOAD.unit('TP_TEMP'))
         self.p_gyro_chart = Chart(
-            self.ui.p_gyro_chart, self.ui.p_gyro_value, 'degrees/s')
+            self.ui.p_gyro_chart, self.ui.p_gyro_value, PAYLOAD.unit('GYRO_R'))
         self.p_accel_chart = Chart(
-            self.ui.p_accel_chart, self.ui.p_accel_value, 'm/s²')
+            self.ui.p_accel_chart, self.ui.p_accel_value, PAYLOAD.unit('ACCEL_R'))
         self.p_mag_chart = Chart(
-            self.ui.p_mag_chart, self.ui.p_mag_value, 'gauss')
+            self.ui.p_mag_chart, self.ui.p_mag_value, PAYLOAD.unit('MAG_R'))
         self.p_ptr_err_chart = Chart(
-            self.ui.p_ptr_err_chart, self.ui.p_ptr_err_value, 'degrees')
+            self.ui.p_ptr_err_chart, self.ui.p_ptr_err_value, PAYLOAD.unit('POINTING_ERROR'))
         self.p_voltage_chart = Chart(
-            self.ui.p_voltage_chart, self.ui.p_voltage_value, 'V')
+            self.ui.p_voltage_chart, self.ui.p_voltage_value, PAYLOAD.unit('TP_VOLTAGE'))
         self.p_altitude_chart = Chart(
-            self.ui.p_altitude_chart, self.ui.p_altitude_value, 'm')
+            self.ui.p_altitude_chart, self.ui.p_altitude_value, PAYLOAD.unit('TP_ALTITUDE'))
+        # Columns drawn by the charts of each stream
+        self.charts = {
+            'C': [(self.c_temp_chart, ('temp',)),
+                  (self.c_altitude_chart, ('altitude',)),
+                  (self.c_gps_altitude_chart, ('gps_altitude',)),
+                  (self.c_voltage_chart, ('voltage',))],
+            # Empty TP_ALTITUDE and TP_TEMP are decoded as their schema default
+            'T': [(self.p_temp_chart, ('tp_temp',)),
+                  (self.p_gyro_chart, ('gyro_r', 'gyro_p', 'gyro_y')),
+                  (self.p_accel_chart, ('accel_r', 'accel_p', 'accel_y')),
+                  (self.p_mag_chart, ('mag_r', 'mag_p', 'mag_y')),
+                  (self.p_ptr_err_chart, ('pointing_error',)),
+                  (self.p_voltage_chart, ('tp_voltage',)),
+                  (self.p_altitude_chart, ('tp_altitude',))],
+        }
+        # Stale charts are only checked again once something may have brought them into view
+        self.exposed = False
+        for charts in self.charts.values():
+            for chart, _ in charts:
+                chart.chart.installEventFilter(self)
+                chart.chart.sigXRangeChanged.connect(self.rangeChanged)
 
         self.reset()
 
+        # Charts and labels are repainted at RENDER_RATE at most, with the latest record of each stream
+        self.render_timer = QTimer(self)
+        self.render_timer.timeout.connect(self.render)
+        if settings.RENDER_RATE:
+            self.render_timer.start(round(1000 / settings.RENDER_RATE))
+
         # Display available ports, if at least one available, initiate TelemetryHandler first in the list
         available_ports = Port.list()
         self.ui.port_value.addItems(available_ports)
@@ -80,6 +115,10 @@ class App(QMainWindow):
         self.telemetry_thread = TelemetryThread()
         self.telemetry_thread.received.connect(self.handleTelemetry)
         self.telemetry_thread.requestHalt.connect(self.stop_lifecycle)
+        self.telemetry_task = None
+        self.port_watcher_thread = PortWatcherThread()
+        self.port_watcher_thread.portsChanged.connect(self.updatePorts)
+        self.port_watcher_thread.start()
 
         self.sim_filename = ''
 
@@ -93,23 +132,42 @@ class App(QMainWindow):
 
         # Start timing
         self.rtc = RTC()
+        self.metrics_shown_at = 0
 
         logger.debug(self.current_port)
-        self.telemetry = TelemetryHandler(self.current_port)
-
         self.lifecycle_thread.start()
-        self.telemetry_thread.start()
+        self.telemetry = self.createTelemetry(self.current_port)
+        if USE_ASYNC_TELEMETRY:
+            self.startTelemetryTask()
+        else:
+            self.telemetry_thread.start()
 
         self.ui.telemetry_box.setEnabled(True)
         self.ui.start_button.pressed.disconnect()
         self.ui.start_button.pressed.connect(self.stop_lifecycle)
         self.ui.start_button.setText('PAUSE')
 
+    def createTelemetry(self, port_name: str):
+        # Same settings whether the lifecycle starts or the port changes during it
+        journal_prefix = f'logs/{self.time_begin}' if settings.RAW_JOURNAL else None
+        handler = AsyncTelemetryHandler if USE_ASYNC_TELEMETRY else TelemetryHandler
+        return handler([port_name] + settings.BACKUP_PORTS, journal_prefix)
+
     def stop_lifecycle(self):
         logger.info('Stopping lifecycle ...')
         self.lifecycle_thread.stop()
-        self.telemetry_thread.stop()
-
+        if USE_ASYNC_TELEMETRY:
+            self.stopTelemetryTask()
+        else:
+            self.telemetry_thread.stop()
+        # Packets still waiting for a gap to fill are logged before the session ends
+        frames = [frame for frame in self.telemetry.flush() if self.recorder.record(frame)]
+        if frames:
+            self.handleTelemetry(frames)
+        self.render()
+
+        self.exportLinkMetrics()
+        self.exportPacketLoss()
         self.telemetry.destroy()
 
         self.ui.telemetry_box.setEnabled(False)
@@ -125,10 +183,69 @@ class App(QMainWindow):
         self.ui.mission_time.setText(self.rtc.time_UTC())
         self.ui.elapsed_time.setText('T + '+self.rtc.time_elapsed())
 
-        self.ui.total_pkg_value.setText(str(
-            self.container_healthy_pkg+self.container_corrupted_pkg+self.payload_healthy_pkg+self.payload_corrupted_pkg))
+        self.ui.total_pkg_value.setText(str(self.recorder.total()))
         self.ui.total_corrupted_pkg_value.setText(
-            str(self.container_corrupted_pkg+self.payload_corrupted_pkg))
+            str(self.recorder.corrupted()))
+
+        # Link metrics, once per second is enough
+        if self.rtc.seconds_elapsed() - self.metrics_shown_at >= 1:
+            self.metrics_shown_at = self.rtc.seconds_elapsed()
+            self.statusBar().showMessage(self.telemetry.metricsSummary())
+
+    def exportLinkMetrics(self):
+        path = f'logs/{self.time_begin}_link_metrics.json'
+        metrics = self.telemetry.metrics()
+        metrics['gui_us_per_packet'] = {
+            'count': self.gui_time.count,
+            'mean': self.gui_time.mean(),
+            'p50': self.gui_time.percentile(50),
+            'p99': self.gui_time.percentile(99),
+            'max': self.gui_time.max,
+        }
+        metrics['gui_us_per_render'] = {
+            'count': self.render_time.count,
+            'mean': self.render_time.mean(),
+            'p50': self.render_time.percentile(50),
+            'p99': self.render_time.percentile(99),
+            'max': self.render_time.max,
+        }
+        exportMetrics(path, metrics)
+        logger.info(f'Link metrics written to {path}')
+        logger.info(f'GUI thread time per packet: {self.gui_time.summary(" us")}')
+        logger.info(f'GUI thread time per repaint: {self.render_time.summary(" us")}')
+
+    def exportPacketLoss(self):
+        path = f'logs/{self.time_begin}_packet_loss.json'
+        exportMetrics(path, {packet_type: gaps.snapshot()
+                             for packet_type, gaps in self.recorder.gaps.items()})
+        for packet_type, gaps in self.recorder.gaps.items():
+            logger.info(f'Packet loss ({packet_type}): {gaps.summary()}')
+        logger.info(f'Packet loss written to {path}')
+
+    def startTelemetryTask(self):
+        self.telemetry_task = asyncio.ensure_future(self.consumeTelemetry())
+
+    def stopTelemetryTask(self):
+        if self.telemetry_task is not None:
+            self.telemetry_task.cancel()
+            self.telemetry_task = None
+
+    async def consumeTelemetry(self):
+        '''
+        Asyncio counterpart of TelemetryThread, runs on the Qt event loop.
+        '''
+        logger.info('Telemetry task started')
+        try:
+            async for frame in self.telemetry.frames():
+                # There is no worker thread here, frames are recorded on the event loop
+                if self.recorder.record(frame):
+                    self.handleTelemetry([frame])
+        except DisconnectException:
+            self.telemetry_task = None
+            self.stop_lifecycle()
+        except asyncio.CancelledError:
+            logger.info('Telemetry task stopped')
+            raise
 
     def open_sim_file(self):
         if self.sim_filename:
@@ -215,34 +332,6 @@ class App(QMainWindow):
         self.ui.reset_button.pressed.connect(self.reset)
 
     def reset(self):
-        self.container_healthy_pkg = 0
-        self.container_corrupted_pkg = 0
-        self.payload_healthy_pkg = 0
-        self.payload_corrupted_pkg = 0
-
-        self.c_pkg_data = []
-        self.p_pkg_data = []
-
-        self.c_temp_data = []
-        self.c_altitude_data = []
-        self.c_gps_altitude_data = []
-        self.c_voltage_data = []
-        self.c_lat_data = []
-        self.c_lng_data = []
-        self.p_temp_data = []
-        self.p_altitude_data = []
-        self.p_gyro_r_data = []
-        self.p_gyro_p_data = []
-        self.p_gyro_y_data = []
-        self.p_accel_r_data = []
-        self.p_accel_p_data = []
-        self.p_accel_y_data = []
-        self.p_mag_r_data = []
-        self.p_mag_p_data = []
-        self.p_mag_y_data = []
-        self.p_ptr_err_data = []
-        self.p_voltage_data = []
-        self.coords = []
         self.c_temp_chart.clear()
         self.c_altitude_chart.clear()
         self.c_gps_altitude_chart.clear()
@@ -263,6 +352,8 @@ class App(QMainWindow):
         self.ui.c_corrupted_pkg_count.setText('0')
         self.ui.p_healthy_pkg_count.setText('0')
         self.ui.p_corrupted_pkg_count.setText('0')
+        self.ui.c_lost_pkg_count.setText('0')
+        self.ui.p_lost_pkg_count.setText('0')
         self.ui.last_cmd_value.setText('-')
         self.ui.telemetry_log.clear()
         self.ui.telemetry_log.clearHistory()
@@ -279,26 +370,28 @@ class App(QMainWindow):
         self.time_begin = self.time_begin.replace(':', '_')
         if not os.path.exists('logs'):
             os.mkdir('logs')
-        with open('Flight_1022_C.csv', 'w') as file:
-            file.write('TEAM_ID,MISSION_TIME,PACKET_COUNT,PACKET_TYPE,MODE,TP_RELEASED,ALTITUDE,TEMP,VOLTAGE,GPS_TIME,GPS_LATITUDE,GPS_LONGITUDE,GPS_ALTITUDE,GPS_SATS,SOFTWARE_STATE,CMD_ECHO\n')
-        with open('Flight_1022_C_with_corrupted.csv', 'w') as file:
-            file.write('TEAM_ID,MISSION_TIME,PACKET_COUNT,PACKET_TYPE,MODE,TP_RELEASED,ALTITUDE,TEMP,VOLTAGE,GPS_TIME,GPS_LATITUDE,GPS_LONGITUDE,GPS_ALTITUDE,GPS_SATS,SOFTWARE_STATE,CMD_ECHO\n')
-        with open(f'logs/{self.time_begin}_Flight_1022_C.csv', 'a') as file:
-            file.write('TEAM_ID,MISSION_TIME,PACKET_COUNT,PACKET_TYPE,MODE,TP_RELEASED,ALTITUDE,TEMP,VOLTAGE,GPS_TIME,GPS_LATITUDE,GPS_LONGITUDE,GPS_ALTITUDE,GPS_SATS,SOFTWARE_STATE,CMD_ECHO\n')
-        with open(f'logs/{self.time_begin}_Flight_1022_C_with_corrupted.csv', 'a') as file:
-            file.write('TEAM_ID,MISSION_TIME,PACKET_COUNT,PACKET_TYPE,MODE,TP_RELEASED,ALTITUDE,TEMP,VOLTAGE,GPS_TIME,GPS_LATITUDE,GPS_LONGITUDE,GPS_ALTITUDE,GPS_SATS,SOFTWARE_STATE,CMD_ECHO\n')
-
-        with open('Flight_1022_T.csv', 'w') as file:
-            file.write('TEAM_ID,MISSION_TIME,PACKET_COUNT,PACKET_TYPE,TP_ALTITUDE,TP_TEMP,TP_VOLTAGE,GYRO_R,GYRO_P,GYRO_Y,ACCEL_R,ACCEL_P,ACCEL_Y,MAG_R,MAG_P,MAG_Y,POINTING_ERROR,TP_SOFTWARE_STATE\n')
-        with open('Flight_1022_T_with_corrupted.csv', 'w') as file:
-            file.write('TEAM_ID,MISSION_TIME,PACKET_COUNT,PACKET_TYPE,TP_ALTITUDE,TP_TEMP,TP_VOLTAGE,GYRO_R,GYRO_P,GYRO_Y,ACCEL_R,ACCEL_P,ACCEL_Y,MAG_R,MAG_P,MAG_Y,POINTING_ERROR,TP_SOFTWARE_STATE\n')
-        with open(f'logs/{self.time_begin}_Flight_1022_T.csv', 'a') as file:
-            file.write('TEAM_ID,MISSION_TIME,PACKET_COUNT,PACKET_TYPE,TP_ALTITUDE,TP_TEMP,TP_VOLTAGE,GYRO_R,GYRO_P,GYRO_Y,ACCEL_R,ACCEL_P,ACCEL_Y,MAG_R,MAG_P,MAG_Y,POINTING_ERROR,TP_SOFTWARE_STATE\n')
-        with open(f'logs/{self.time_begin}_Flight_1022_T_with_corrupted.csv', 'a') as file:
-            file.write('TEAM_ID,MISSION_TIME,PACKET_COUNT,PACKET_TYPE,TP_ALTITUDE,TP_TEMP,TP_VOLTAGE,GYRO_R,GYRO_P,GYRO_Y,ACCEL_R,ACCEL_P,ACCEL_Y,MAG_R,MAG_P,MAG_Y,POINTING_ERROR,TP_SOFTWARE_STATE\n')
-
-        self.dirloader = LoadDirectory(
-            'neilkml', 'neilcsv', 'csv', earth_save_name=self.time_begin, folder_name='kml')
+        if hasattr(self, 'recorder'):
+            self.recorder.close()
+        self.recorder = TelemetryRecorder(
+            self.time_begin, self.mqtt_client if self.mqtt_enabled else None)
+        # Numeric fields of the healthy packets of each stream, plotted from
+        if hasattr(self, 'stores'):
+            for store in self.stores.values():
+                store.close()
+        self.stores = {packet_type: TelemetryStore(
+            schema, retention=settings.HISTORY_RETENTION[packet_type],
+            spill_path=f'logs/{self.time_begin}_{packet_type}_history.f64')
+            for packet_type, schema in (('C', CONTAINER), ('T', PAYLOAD))}
+        # Time spent in handleTelemetry per packet and in render per repaint, in microseconds
+        self.gui_time = Histogram()
+        self.render_time = Histogram()
+        # Latest healthy record of each stream not drawn yet, and whether the counters changed
+        self.dirty = {}
+        # Latest healthy record of each stream, the chart labels show its values
+        self.records = {}
+        self.counts_dirty = False
+        # Lines of the received frames not added to the telemetry log yet
+        self.log_lines = []
 
         # Initialize map
         # if not os.path.exists('kml'):
@@ -318,6 +411,7 @@ class App(QMainWindow):
             try:
                 self.mqtt_client.connect("krissada.com", 1883)
                 self.mqtt_enabled = True
+                self.recorder.mqtt = self.mqtt_client
                 logger.info('Connected to MQTT broker')
                 self.ui.telemetry_log.append('Connected to MQTT broker')
             except Exception:
@@ -327,48 +421,82 @@ class App(QMainWindow):
         else:
             logger.info('Disconnected from MQTT broker')
             self.ui.telemetry_log.append('Disconnected from MQTT broker')
+            self.recorder.mqtt = None
             self.mqtt_client.disconnect()
             self.mqtt_enabled = False
 
-    def handleTelemetry(self, data: str):
-        # Display in log widget
-        if(not data or data == '\r' or data == '\n'):
-            return
-        # self.ui.telemetry_log.append(f'📩 {data}')
-        if self.ui.autoscroll_check.isChecked():
-            scrollbar = self.ui.telemetry_log.verticalScrollBar()
-            scrollbar.setValue(scrollbar.maximum())
-        if data is None:
-            logger.error('Received data is None')
+    def handleTelemetry(self, frames: list):
+        '''
+        Display a batch of frames. They have been logged and counted by the
+        TelemetryRecorder already, they are only added to the telemetry log
+        and the chart data here, render() draws them.
+        '''
+        start = time.perf_counter_ns()
+        for frame in frames:
+            self.log_lines.append(f'📩 {frame.data}')
+            if frame.record is None:
+                continue
+            self.stores[frame.packet_type].append(frame.record)
+            self.dirty[frame.packet_type] = frame.record
+            self.records[frame.packet_type] = frame.record
+        self.counts_dirty = True
+        self.gui_time.record((time.perf_counter_ns() - start) // 1000 // len(frames))
+        if not settings.RENDER_RATE:
+            self.render()
+
+    def render(self):
+        '''
+        Repaint what changed since the last call, on the render timer.
+        Bursts of packets are drawn once, with the latest record, and
+        added to the telemetry log as one block. Charts that were not
+        visible are drawn once they are shown or resized.
+        '''
+        exposed, self.exposed = self.exposed, False
+        if not self.counts_dirty and not self.dirty and not self.log_lines and not exposed:
             return
-        with open('rawfilterwithouttp.csv', 'a') as f:
-            f.write(data+'\n')
-        pkg = data.split(',')
-        # pkg[1] = datetime.utcnow().strftime('%H:%M:%S')
-        # pkg[9] = datetime.utcnow().strftime('%H:%M:%S')
-        if self.mqtt_enabled:
-            self.mqtt_client.publish('teams/1022', data)
-
-        # Determine package origin
-        if pkg[3] == 'C':
-            self.ui.telemetry_log.append(f'📩 {data}')
-            # logger.info(f'[CANSAT] :{data}')
-            with open('Flight_1022_C_with_corrupted.csv', 'a') as f:
-                f.write(data+'\n')
-            with open(f'logs/{self.time_begin}_Flight_1022_C_with_corrupted.csv', 'a') as f:
-                f.write(data+'\n')
-            self.latest_container_telemetry = pkg[:]
-            self.updateContainer()
-        elif pkg[3] == 'T':
-            # PLS REMOVE THIS AFTERWARDS, THANKS :)
-            self.ui.telemetry_log.append(f'📩 {data}')
-            # logger.info(f'[PAYLOAD]: {data}')
-            with open('Flight_1022_T_with_corrupted.csv', 'a') as f:
-                f.write(data+'\n')
-            with open(f'logs/{self.time_begin}_Flight_1022_T_with_corrupted.csv', 'a') as f:
-                f.write(data+'\n')
-            self.latest_payload_telemetry = pkg[:]
-            self.updatePayload()
+        start = time.perf_counter_ns()
+        latest, self.dirty = self.dirty, {}
+        if self.log_lines:
+            # Every line becomes a paragraph of its own, as with one append per frame
+            self.ui.telemetry_log.append('\n'.join(self.log_lines))
+            self.log_lines = []
+            if self.ui.autoscroll_check.isChecked():
+                scrollbar = self.ui.telemetry_log.verticalScrollBar()
+                scrollbar.setValue(scrollbar.maximum())
+        if self.counts_dirty:
+            self.counts_dirty = False
+            counts = self.recorder.counts
+            self.ui.c_healthy_pkg_count.setText(str(counts['C']['healthy']))
+            self.ui.c_corrupted_pkg_count.setText(str(counts['C']['corrupted']))
+            self.ui.p_healthy_pkg_count.setText(str(counts['T']['healthy']))
+            self.ui.p_corrupted_pkg_count.setText(str(counts['T']['corrupted']))
+            self.ui.c_lost_pkg_count.setText(self.recorder.gaps['C'].label())
+            self.ui.p_lost_pkg_count.setText(self.recorder.gaps['T'].label())
+        if 'C' in latest:
+            self.updateContainer(latest['C'])
+        if 'T' in latest:
+            self.updatePayload(latest['T'])
+        for packet_type in self.charts:
+            if packet_type in latest:
+                self.drawCharts(packet_type)
+            elif exposed:
+                self.drawCharts(packet_type, stale_only=True)
+        self.render_time.record((time.perf_counter_ns() - start) // 1000)
+
+    def eventFilter(self, watched, event):
+        # A chart shown (e.g. the window restored) or resized (e.g. a splitter moved) may be visible again
+        if event.type() in (QEvent.Show, QEvent.Resize):
+            self.exposed = True
+        return super().eventFilter(watched, event)
+
+    def rangeChanged(self):
+        # Zoomed charts are marked stale by Chart.rangeChanged, connected first
+        self.exposed = True
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.WindowStateChange:
+            self.exposed = True
+        super().changeEvent(event)
 
     def updateCmdPreview(self):
         command = self.ui.cmd_select_box.currentText()
@@ -412,68 +540,57 @@ class App(QMainWindow):
         self.telemetry.sendRawCommand(self.ui.cmd_preview.text())
         self.ui.telemetry_log.append(f'📨 {self.ui.cmd_preview.text()}')
 
-    def updateContainer(self):
-        # Destructuring telemetry data
-        try:
-            TEAM_ID, MISSION_TIME, PACKET_COUNT, PACKET_TYPE, MODE, TP_RELEASED, ALTITUDE, TEMP, VOLTAGE, GPS_TIME, GPS_LATITUDE, GPS_LONGITUDE, GPS_ALTITUDE, GPS_SATS, SOFTWARE_STATE, CMD_ECHO = self.latest_container_telemetry
-            self.container_healthy_pkg += 1
-            self.ui.c_healthy_pkg_count.setText(
-                str(self.container_healthy_pkg))
-            with open('Flight_1022_C.csv', 'a') as file:
-                file.write(','.join(self.latest_container_telemetry)+'\n')
-            with open(f'logs/{self.time_begin}_Flight_1022_C.csv', 'a') as file:
-                file.write(','.join(self.latest_container_telemetry)+'\n')
-
-        except Exception:
-            self.container_corrupted_pkg += 1
-            self.ui.c_corrupted_pkg_count.setText(
-                str(self.container_corrupted_pkg))
-            logger.warning(
-                f'Corrupted packet: {self.latest_container_telemetry}')
+    def chartData(self, store: TelemetryStore, *names: str, view_range: tuple = None) -> tuple:
+        # Packet axis and columns over the charted span or the zoomed range, decimated to a fixed number of points
+        axis = INDEX if settings.PACKET_COUNT_ORIGIN == 'local' else 'packet_count'
+        if view_range is not None:
+            first, last = store.span(axis, *view_range)
+        else:
+            first = 0 if settings.CHART_SPAN is None else len(store) - settings.CHART_SPAN
+            last = None
+        return store.decimate(axis, *names, first=first, last=last, points=settings.CHART_POINTS)
+
+    def drawCharts(self, packet_type: str, stale_only: bool = False):
+        # Charts off screen are only marked stale, their data is not even decimated
+        visible = []
+        for chart, names in self.charts[packet_type]:
+            if stale_only and not chart.stale:
+                continue
+            if chart.visible():
+                visible.append((chart, names))
+            else:
+                chart.stale = True
+        if not visible:
             return
-
-        # Update data
-        self.c_pkg_data.append(
-            self.container_healthy_pkg if settings.PACKET_COUNT_ORIGIN == 'local' else int(PACKET_COUNT))
-        self.c_temp_data.append(float(TEMP))
-        self.c_altitude_data.append(float(ALTITUDE))
-        self.c_gps_altitude_data.append(float(GPS_ALTITUDE))
-        self.c_voltage_data.append(float(VOLTAGE))
-        self.c_lat_data = GPS_LATITUDE
-        self.c_lng_data = GPS_LONGITUDE
-        self.ui.c_state.setText(SOFTWARE_STATE)
+        store = self.stores[packet_type]
+        record = self.records[packet_type]
+        # Charts following the data share one decimation, zoomed ones get their own
+        following = [(chart, names) for chart, names in visible if chart.view_range is None]
+        groups = [(following, None)] if following else []
+        groups += [([(chart, names)], chart.view_range) for chart, names in visible if chart.view_range is not None]
+        for charts, view_range in groups:
+            x, *columns = self.chartData(
+                store, *(name for _, names in charts for name in names), view_range=view_range)
+            for chart, names in charts:
+                values, columns = columns[:len(names)], columns[len(names):]
+                chart.plot(x, tuple(values) if len(names) > 1 else values[0],
+                           tuple(getattr(record, name) for name in names))
+
+    def updateContainer(self, record):
+        self.ui.c_state.setText(record.software_state)
 
         # Update state progress bar
         state_progress = 0
-        if SOFTWARE_STATE == 'PRELAUNCH':
-            state_progress = 1
-        elif SOFTWARE_STATE == 'LAUNCH':
-            state_progress = 2
-        elif SOFTWARE_STATE == 'APOGEE':
-            state_progress = 3
-        elif SOFTWARE_STATE == 'PARADEPLOY':
-            state_progress = 4
-        elif SOFTWARE_STATE == 'TPDEPLOY':
-            state_progress = 5
-        elif SOFTWARE_STATE == 'LAND':
-            state_progress = 6
+        if record.software_state in CONTAINER_STATES:
+            state_progress = CONTAINER_STATES.index(record.software_state) + 1
         self.ui.stage_bar.setValue(state_progress)
 
-        # Update chart
-        self.c_temp_chart.plot(self.c_pkg_data, self.c_temp_data)
-        self.c_altitude_chart .plot(self.c_pkg_data, self.c_altitude_data)
-        self.c_gps_altitude_chart .plot(
-            self.c_pkg_data, self.c_gps_altitude_data)
-        self.c_voltage_chart .plot(self.c_pkg_data, self.c_voltage_data)
-
         # Update map
-        self.ui.lat_value.setText(GPS_LATITUDE)
-        self.ui.lng_value.setText(GPS_LONGITUDE)
-        self.ui.sats_value.setText(GPS_SATS)
-        self.dirloader.appendEarthCoord(Coordinate(
-            GPS_LATITUDE, GPS_LONGITUDE, ALTITUDE), color='ff00ff00')
+        self.ui.lat_value.setText(str(record.gps_latitude))
+        self.ui.lng_value.setText(str(record.gps_longitude))
+        self.ui.sats_value.setText(str(record.gps_sats))
         # Update battery
-        bat_percent = self.batteryPercentage(float(VOLTAGE))
+        bat_percent = self.batteryPercentage(record.voltage)
         self.ui.container_battery_percent.setText(
             f'{bat_percent.__round__(2)}%')
         self.ui.c_battery_visual.setValue(int(bat_percent))
@@ -486,59 +603,13 @@ class App(QMainWindow):
 
         # self.ui.c_apogee.setText(PRESSURE)
 
-        self.ui.last_cmd_value.setText(CMD_ECHO)
+        self.ui.last_cmd_value.setText(record.cmd_echo)
 
-    def updatePayload(self):
-        # Destructuring telemetry data
-        try:
-            TEAM_ID, MISSION_TIME, PACKET_COUNT, PACKET_TYPE, TP_ALTITUDE, TP_TEMP, TP_VOLTAGE, GYRO_R, GYRO_P, GYRO_Y, ACCEL_R, ACCEL_P, ACCEL_Y, MAG_R, MAG_P, MAG_Y, POINTING_ERROR, TP_SOFTWARE_STATE = self.latest_payload_telemetry
-            self.payload_healthy_pkg += 1
-            self.ui.p_healthy_pkg_count.setText(
-                str(self.payload_healthy_pkg))
-            with open('Flight_1022_T.csv', 'a') as file:
-                file.write(','.join(self.latest_payload_telemetry)+'\n')
-            with open(f'logs/{self.time_begin}_Flight_1022_T.csv', 'a') as file:
-                file.write(','.join(self.latest_payload_telemetry)+'\n')
-        except Exception:
-            self.payload_corrupted_pkg += 1
-            self.ui.p_corrupted_pkg_count.setText(
-                str(self.payload_corrupted_pkg))
-            logger.warning(
-                f'Corrupted packet: {self.latest_payload_telemetry}')
-            return
-
-        # Update data
-        self.p_pkg_data.append(
-            self.payload_healthy_pkg if settings.PACKET_COUNT_ORIGIN == 'local' else int(PACKET_COUNT))
-        self.p_temp_data.append(float(TP_TEMP or -1))
-        self.p_altitude_data.append(float(TP_ALTITUDE or -1))
-        self.p_gyro_r_data.append(float(GYRO_R))
-        self.p_gyro_p_data.append(float(GYRO_P))
-        self.p_gyro_y_data.append(float(GYRO_Y))
-        self.p_accel_r_data.append(float(ACCEL_R))
-        self.p_accel_p_data.append(float(ACCEL_P))
-        self.p_accel_y_data.append(float(ACCEL_Y))
-        self.p_mag_r_data.append(float(MAG_R))
-        self.p_mag_p_data.append(float(MAG_P))
-        self.p_mag_y_data.append(float(MAG_Y))
-        self.p_ptr_err_data.append(float(POINTING_ERROR))
-        self.p_voltage_data.append(float(TP_VOLTAGE))
-        self.ui.p_state.setText(TP_SOFTWARE_STATE)
-
-        # Update chart
-        self.p_temp_chart.plot(self.p_pkg_data, self.p_temp_data)
-        self.p_gyro_chart.plot(
-            self.p_pkg_data, (self.p_gyro_r_data, self.p_gyro_p_data, self.p_gyro_y_data))
-        self.p_accel_chart.plot(
-            self.p_pkg_data, (self.p_accel_r_data, self.p_accel_p_data, self.p_accel_y_data))
-        self.p_mag_chart.plot(
-            self.p_pkg_data, (self.p_mag_r_data, self.p_mag_p_data, self.p_mag_y_data))
-        self.p_ptr_err_chart.plot(self.p_pkg_data, self.p_ptr_err_data)
-        self.p_voltage_chart.plot(self.p_pkg_data, self.p_voltage_data)
-        self.p_altitude_chart.plot(self.p_pkg_data, self.p_altitude_data)
+    def updatePayload(self, record):
+        self.ui.p_state.setText(record.tp_software_state)
 
         # Update battery
-        bat_percent = self.batteryPercentage(float(TP_VOLTAGE))
+        bat_percent = self.batteryPercentage(record.tp_voltage)
         self.ui.payload_battery_percent.setText(
             f'{bat_percent.__round__(2)}%')
         self.ui.p_battery_visual.setValue(int(bat_percent))
@@ -573,15 +644,38 @@ class App(QMainWindow):
         self.current_port = port_name
         if not self.lifecycle_thread.isRunning():
             return
-        if hasattr(self, 'telemetry') and self.telemetry is not None:
+        if USE_ASYNC_TELEMETRY:
+            self.stopTelemetryTask()
+            if hasattr(self, 'telemetry') and self.telemetry is not None:
+                self.telemetry.setPort(port_name)
+            else:
+                self.telemetry = self.createTelemetry(port_name)
+            self.startTelemetryTask()
+        elif hasattr(self, 'telemetry') and self.telemetry is not None:
             self.telemetry.setPort(port_name)
         else:
-            self.telemetry = TelemetryHandler(port_name)
+            self.telemetry = self.createTelemetry(port_name)
 
     def refreshPort(self):
         logger.debug('Refreshing ports')
+        self.updatePorts(Port.list(refresh=True))
+
+    def updatePorts(self, ports: list):
+        '''
+        Repopulate the port box without switching the port in use.
+        '''
+        running = self.lifecycle_thread.isRunning()
+        if running and self.current_port and self.current_port not in ports:
+            # Keep showing the radio in use, it may only be glitching
+            ports = [self.current_port] + ports
+        self.ui.port_value.blockSignals(True)
         self.ui.port_value.clear()
-        self.ui.port_value.addItems(Port.list())
+        self.ui.port_value.addItems(ports)
+        if self.current_port in ports:
+            self.ui.port_value.setCurrentText(self.current_port)
+        elif not running:
+            self.current_port = ports[0] if ports else None
+        self.ui.port_value.blockSignals(False)
 
     def selectSimFile(self):
         self.sim_filename, _ = QFileDialog.getOpenFileName(
@@ -628,7 +722,6 @@ class TelemetryThread(QThread):
     requestHalt = QtCore.Signal(object)
 
     def __init__(self):
-        self._isRunning = True
         super(TelemetryThread, self).__init__(None)
 
     # def __del__(self):
@@ -636,19 +729,59 @@ class TelemetryThread(QThread):
 
     def run(self):
         logger.info('Telemetry thread started')
-        while True:
+        disconnected = False
+        # Reads time out every TelemetryHandler.poll_interval, so a stop is seen soon
+        while not disconnected and not self.isInterruptionRequested():
+            # Every frame of one read is logged here and displayed as one batch
+            batch = []
             try:
-                incoming_data = window.telemetry.read()
+                for frame in window.telemetry.frames():
+                    if window.recorder.record(frame):
+                        batch.append(frame)
             except DisconnectException:
-                self.requestHalt.emit(None)
-                return
-            self.received.emit(incoming_data)
+                disconnected = True
+            if batch:
+                self.received.emit(batch)
+        if not self.isInterruptionRequested():
+            self.requestHalt.emit(None)
 
     def stop(self):
+        '''
+        Let run() return after the frame it is recording, never terminate
+        it: that could leave the lock of the TelemetryRecorder held.
+        '''
         logger.info('Telemetry thread stopping')
+        self.requestInterruption()
+        # Also ends a reconnect wait, and wakes a reader blocked on the merge queue
+        window.telemetry.closePorts()
+        self.wait()
+        logger.info('Telemetry thread stopped')
+
+
+class PortWatcherThread(QThread):
+
+    # Carriers
+    portsChanged = QtCore.Signal(object)
+
+    def __init__(self, interval: float = 1):
+        self._isRunning = True
+        self.interval = interval
+        super(PortWatcherThread, self).__init__(None)
+
+    def run(self):
+        logger.info('Port watcher thread started')
+        while self._isRunning:
+            ports = discovery.poll()
+            if ports is not None:
+                logger.info(f'Ports changed: {ports}')
+                self.portsChanged.emit(ports)
+            time.sleep(self.interval)
+
+    def stop(self):
+        logger.info('Port watcher thread stopping')
         self._isRunning = False
         self.terminate()
-        logger.info('Telemetry thread stopped')
+        logger.info('Port watcher thread stopped')
 
 
 class SimThread(QThread):
@@ -683,6 +816,11 @@ if __name__ == '__main__':
     # pg.setConfigOption('readonly', True)
 
     app = QtWidgets.QApplication(sys.argv)
+    loop = None
+    if USE_ASYNC_TELEMETRY:
+        import qasync
+        loop = qasync.QEventLoop(app)
+        asyncio.set_event_loop(loop)
     window = App()
     window.showMaximized()
     # window.showFullScreen()
@@ -692,6 +830,9 @@ if __name__ == '__main__':
 
     try:
         logger.info('Starting window ...')
+        if loop is not None:
+            with loop:
+                sys.exit(loop.run_forever())
         sys.exit(app.exec())
     except SystemExit:
         if hasattr(window, 'sim_thread') and window.sim_thread.isRunning():
@@ -700,4 +841,6 @@ if __name__ == '__main__':
             window.lifecycle_thread.stop()
         if hasattr(window, 'telemetry_thread') and window.telemetry_thread.isRunning():
             window.telemetry_thread.stop()
+        if hasattr(window, 'port_watcher_thread') and window.port_watcher_thread.isRunning():
+            window.port_watcher_thread.stop()
         logger.info('Closing window ...')
@@ -0,0 +1,72 @@
+'''
+Chart updates per second, clear-and-replot against persistent curves.
+
+Chart.plot used to clear the PlotWidget and create new PlotDataItems with
+symbols on every packet. Now it keeps one curve per series and updates it
+with setData, symbols only when there are few points. Each update is
+painted with repaint(), like a visible chart, on the offscreen platform.
+Needs PySide6 and pyqtgraph.
+
+Run from the repository root:
+    python -m benchmarks.chart [updates]
+'''
+import os
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np  # noqa: E402
+from pyqtgraph import PlotWidget  # noqa: E402
+from PySide6.QtWidgets import QApplication, QLabel  # noqa: E402
+
+from lib.chart import Chart  # noqa: E402
+
+
+class LegacyChart(Chart):
+    # Chart.plot before persistent curves, kept here as the baseline
+    def plot(self, x: list, y):
+        self.chart.clear()
+        if type(y) is tuple:
+            self.display.setText(f'{y[0][-1]}, {y[1][-1]}, {y[2][-1]} {self.unit}')
+            for values, pen in zip(y, ('r', 'g', 'c')):
+                self.chart.plot(**{'x': x, 'y': values,
+                                   'symbol': 'o', 'symbolSize': 6, 'symbolPen': pen, 'pen': pen})
+        else:
+            self.display.setText(f'{y[-1]} {self.unit}')
+            self.chart.plot(**{'x': x, 'y': y, 'symbol': 'o', 'symbolSize': 6})
+
+
+def series(points: int, axes: int, shift: int):
+    x = np.arange(shift, shift + points, dtype=float)
+    y = tuple(np.sin(x / 50 + axis) for axis in range(axes))
+    return x, (y if axes > 1 else y[0])
+
+
+def bench(chart: Chart, widget: PlotWidget, points: int, axes: int, updates: int) -> float:
+    data = [series(points, axes, shift) for shift in range(updates)]
+    start = time.perf_counter()
+    for x, y in data:
+        chart.plot(x, y)
+        widget.repaint()
+    return updates / (time.perf_counter() - start)
+
+
+def main(updates: int):
+    app = QApplication.instance() or QApplication(sys.argv)
+    print(f'{"":<28}{"clear and plot":>16}{"setData":>12}')
+    for points, axes in ((49, 1), (49, 3), (1000, 1), (1000, 3)):
+        rates = []
+        for kind in (LegacyChart, Chart):
+            widget = PlotWidget()
+            widget.resize(600, 300)
+            widget.show()
+            display = QLabel()
+            rates.append(bench(kind(widget, display, 'm'), widget, points, axes, updates))
+            widget.close()
+            app.processEvents()
+        print(f'{f"{points} points x {axes} series":<28}{rates[0]:>12.0f} /s{rates[1]:>10.0f} /s')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
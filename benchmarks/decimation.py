@@ -0,0 +1,47 @@
+'''
+Points drawn for a whole-session payload chart and time to decimate them.
+
+The charts used to draw x[-50:-1], the 49 packets before the newest. Now
+they can show the whole session: App.chartData decimates the columns with
+TelemetryStore.decimate. pyqtgraph renders in time proportional to the
+points it is given, they should stay bounded as the session grows while
+every packet in memory keeps growing up to HISTORY_RETENTION.
+
+Run from the repository root:
+    python -m benchmarks.decimation [points]
+'''
+import sys
+import time
+
+from benchmarks.store import records
+from lib.schema import PAYLOAD
+from lib.store import TelemetryStore
+
+SESSIONS = (1000, 10000, 100000, 1000000)
+GYRO = ('gyro_r', 'gyro_p', 'gyro_y')
+
+
+def decimated(store: TelemetryStore, points: int):
+    return store.decimate('packet_count', *GYRO, points=points)
+
+
+def timed(function, *args, repeat: int = 20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function(*args)
+    return (time.perf_counter() - start) / repeat * 1e6, len(result[0])
+
+
+def main(points: int):
+    store = TelemetryStore(PAYLOAD, retention=14400)
+    print(f'{"packets":>10}{"in memory":>14}{f"decimate({points})":>24}')
+    stream = records(SESSIONS[-1])
+    for session in SESSIONS:
+        while len(store) < session:
+            store.append(next(stream))
+        decimated_us, decimated_points = timed(decimated, store, points)
+        print(f'{session:>10}{len(store["packet_count"]):>10} pts{decimated_points:>10} pts{decimated_us:>7.0f} us')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,233 @@
+'''
+Microbenchmark of the serial framing paths.
+
+Compares the original byte-at-a-time Port.read, the chunked Port.frames and
+a zero-copy RingFramer against an in-memory stand-in for serial.Serial.
+
+RingFramer only lives here. Framing alone it is faster than Port.frames,
+but the validator needs every frame as a str. RingPort reads through it
+inside Port, cleaning every frame and counting it in the link metrics
+like Port._readChunk does, and that per-frame Python loop comes out 20-30%
+slower than the C-level split of Port.frames, so the serial path does
+not use it.
+
+Run from the repository root:
+    python -m benchmarks.framer [packets]
+'''
+import random
+import string
+import sys
+import time
+
+from lib.logger import logger
+from lib.port import Port
+
+CONTAINER = '1022,13:02:{:02d}.50,{},C,F,N,{:.1f},25.3,7.91,13:02:{:02d},13.7304,100.7764,{:.1f},8,LAUNCH,CXON\r\n'
+PAYLOAD = '1022,13:02:{:02d}.50,{},T,{:.1f},25.70,6.26,-0.19,-0.12,0.06,1.33,-3.35,9.11,-43.06,-37.56,-53.69,0.00,IDLE\r\n'
+
+
+class FakeSerial:
+    '''
+    Serves a prepared byte stream in randomly sized bursts, like a UART
+    buffer that fills up between reads.
+    '''
+    is_open = True
+
+    def __init__(self, data: bytes, seed=1022):
+        self.data = data
+        self.pos = 0
+        self.random = random.Random(seed)
+        self.burst = 0
+
+    @property
+    def in_waiting(self):
+        if not self.burst:
+            self.burst = min(self.random.randint(
+                1, 512), len(self.data) - self.pos)
+        return self.burst
+
+    def read(self, size=1):
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += len(chunk)
+        self.burst = max(self.burst - len(chunk), 0)
+        return chunk
+
+    def readinto(self, buffer):
+        chunk = self.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+    def exhausted(self):
+        return self.pos >= len(self.data)
+
+
+class RingFramer:
+    '''
+    Preallocated receive buffer filled in place by serial.Serial.readinto.
+    Complete frames are handed out as memoryview slices, so nothing is copied
+    or decoded until a consumer really needs a str (e.g. str(frame, 'ascii')).
+    A slice stays valid until the next fill(). Instead of splitting frames
+    across the wrap point, only the partial tail is moved back to the front.
+    '''
+
+    def __init__(self, terminate_char: str = '\r', capacity: int = 65536):
+        self.capacity = capacity
+        self.buffer = bytearray(capacity)
+        self.view = memoryview(self.buffer)
+        self.terminator = ord(terminate_char)
+        self.start = 0  # first byte not yet handed out
+        self.end = 0    # one past the last byte written
+        self.overflows = 0
+
+    def _compact(self):
+        tail = self.end - self.start
+        self.buffer[:tail] = self.view[self.start:self.end]
+        self.start, self.end = 0, tail
+
+    def fill(self, device):
+        '''
+        Read everything waiting on the device straight into the free space.
+        '''
+        if self.start == self.end:
+            self.start = self.end = 0
+        elif self.start and self.end > self.capacity - (self.capacity >> 2):
+            self._compact()
+        elif self.end == self.capacity:
+            # The whole buffer is a single unterminated frame, nothing to keep
+            logger.warning(
+                f'Dropping {self.end} bytes without a frame terminator')
+            self.overflows += 1
+            self.start = self.end = 0
+        size = min(max(device.in_waiting, 1), self.capacity - self.end)
+        read = device.readinto(self.view[self.end:self.end + size]) or 0
+        self.end += read
+        return read
+
+    def frames(self):
+        '''
+        Yield a memoryview for every complete frame in the buffer.
+        Leading LF bytes left over from CRLF line endings are skipped.
+        '''
+        buffer, view, terminator = self.buffer, self.view, self.terminator
+        while True:
+            stop = buffer.find(terminator, self.start, self.end)
+            if stop < 0:
+                return
+            begin = self.start
+            while begin < stop and buffer[begin] == 0x0A:
+                begin += 1
+            self.start = stop + 1
+            if begin < stop:
+                yield view[begin:stop]
+
+
+class RingPort(Port):
+    '''
+    Port reading through a RingFramer, the variant the serial path was
+    measured with: every frame is still cleaned into a str and counted in
+    the link metrics, as in Port._readChunk.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ring = RingFramer(self.terminate_char, capacity=self.chunk_size * 16)
+
+    def _readChunk(self):
+        ring = self.ring
+        read = ring.fill(self.device)
+        if not read:
+            return
+        metrics = self.metrics
+        metrics.bytes_read += read
+        now = time.perf_counter_ns()
+        pending = len(self._pending)
+        for frame in ring.frames():
+            frame = self._clean(bytes(frame))
+            if frame:
+                self._pending.append(frame)
+                metrics.frameArrived(now)
+        if len(self._pending) > pending:
+            self.last_frame_time = time.monotonic()
+        metrics.chunkRead(now, len(self._pending) - pending, ring.start < ring.end)
+
+
+def stream(packets: int):
+    lines = []
+    for i in range(packets):
+        if i % 2:
+            lines.append(CONTAINER.format(i % 60, i, i * 0.5, i % 60, i * 0.5))
+        else:
+            lines.append(PAYLOAD.format(i % 60, i, i * 0.5))
+    return ''.join(lines).encode('ascii')
+
+
+def legacy_read(device, terminate_char='\r'):
+    # Port.read before chunked framing, kept here as the baseline
+    combined = ''
+    current_char = None
+    while current_char != terminate_char:
+        current_char = device.read().decode('utf-8')
+        if current_char in string.printable:
+            combined += current_char
+    return combined.replace('\r', '').replace('\n', '')
+
+
+def bench_legacy(data: bytes, packets: int):
+    device = FakeSerial(data)
+    for _ in range(packets):
+        legacy_read(device)
+
+
+def bench_chunked(data: bytes, packets: int):
+    port = Port('bench', '\r')
+    port.device = FakeSerial(data)
+    while not port.device.exhausted():
+        for frame in port.frames():
+            pass
+
+
+def bench_ring_port(data: bytes, packets: int):
+    port = RingPort('bench', '\r')
+    port.device = FakeSerial(data)
+    while not port.device.exhausted():
+        for frame in port.frames():
+            pass
+
+
+def bench_ring(data: bytes, packets: int):
+    framer = RingFramer('\r')
+    device = FakeSerial(data)
+    while not device.exhausted():
+        framer.fill(device)
+        for frame in framer.frames():
+            pass
+
+
+def bench_ring_decode(data: bytes, packets: int):
+    framer = RingFramer('\r')
+    device = FakeSerial(data)
+    while not device.exhausted():
+        framer.fill(device)
+        for frame in framer.frames():
+            str(frame, 'ascii')
+
+
+def main(packets: int):
+    data = stream(packets)
+    print(f'{packets} packets, {len(data)} bytes')
+    baseline = None
+    for name, bench in (('byte-at-a-time Port.read', bench_legacy),
+                        ('chunked Port.frames', bench_chunked),
+                        ('RingFramer in Port.frames', bench_ring_port),
+                        ('RingFramer (memoryview)', bench_ring),
+                        ('RingFramer + str decode', bench_ring_decode)):
+        start = time.perf_counter()
+        bench(data, packets)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f'{name:<28}{elapsed * 1000:10.1f} ms'
+              f'{packets / elapsed:14.0f} frames/s{baseline / elapsed:8.1f}x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
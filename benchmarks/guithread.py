@@ -0,0 +1,268 @@
+'''
+GUI thread time per packet, widgets included.
+
+Before, App.handleTelemetry ran once per packet. It appended the frame to
+the raw log (opening it every time), four CSV logs and the KML track,
+counted it, appended its values to lists and replotted every chart of its
+stream with the last 49 packets. LegacyApp keeps that slot body, with the
+logs, lists and clear-and-replot charts of the time, as the baseline.
+
+Now TelemetryRecorder does the file work on the telemetry thread, the
+slot only appends the records to the TelemetryStore and render() repaints
+at RENDER_RATE, so the GUI thread cost depends on the packet rate. Both
+run in the real window and paint after every slot call or render, on the
+offscreen platform. Needs PySide6 and pyqtgraph.
+
+Run from the repository root:
+    python -m benchmarks.guithread [packets]
+'''
+import logging
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+import settings  # noqa: E402
+from app import App  # noqa: E402
+from benchmarks.framer import CONTAINER, PAYLOAD  # noqa: E402
+from lib.chart import Chart  # noqa: E402
+from lib.gearth import Coordinate, LoadDirectory  # noqa: E402
+from lib.logger import logger  # noqa: E402
+from lib.schema import CONTAINER as CONTAINER_SCHEMA, CONTAINER_STATES, PAYLOAD as PAYLOAD_SCHEMA, CsvLog  # noqa: E402
+from lib.validation import Frame, FrameValidator  # noqa: E402
+
+RATES = (5, 50, 500)  # packets per second
+
+
+def frames(packets: int):
+    validator = FrameValidator()
+    lines = []
+    for i in range(packets):
+        if i % 5:
+            lines.append(PAYLOAD.format(i % 60, i, i * 0.5))
+        else:
+            lines.append(CONTAINER.format(i % 60, i, i * 0.5, i % 60, i * 0.5))
+    return [validator.classify(line.strip()) for line in lines]
+
+
+class LegacyChart(Chart):
+    # Chart.plot before persistent curves and decimation
+    def plot(self, x: list, y):
+        self.chart.clear()
+        if type(y) is tuple:
+            self.display.setText(f'{y[0][-1]}, {y[1][-1]}, {y[2][-1]} {self.unit}')
+            for values, pen in zip(y, ('r', 'g', 'c')):
+                self.chart.plot(**{'x': x[-50:-1], 'y': values[-50:-1],
+                                   'symbol': 'o', 'symbolSize': 6, 'symbolPen': pen, 'pen': pen})
+        else:
+            self.display.setText(f'{y[-1]} {self.unit}')
+            self.chart.plot(**{'x': x[-50:-1], 'y': y[-50:-1], 'symbol': 'o', 'symbolSize': 6})
+
+
+class LegacyApp(App):
+    '''
+    App.handleTelemetry, updateContainer and updatePayload before
+    TelemetryRecorder, kept here as the baseline.
+    '''
+    # PySide resolves self.connect() to QObject.connect in subclasses otherwise
+    connect = App.connect
+
+    def __init__(self):
+        super().__init__()
+        self.render_timer.stop()
+        for name, chart in list(vars(self).items()):
+            if isinstance(chart, Chart):
+                setattr(self, name, LegacyChart(chart.chart, chart.display, chart.unit))
+
+    def reset(self):
+        super().reset()
+        self.container_healthy_pkg = 0
+        self.container_corrupted_pkg = 0
+        self.payload_healthy_pkg = 0
+        self.payload_corrupted_pkg = 0
+        self.c_pkg_data, self.c_temp_data, self.c_altitude_data = [], [], []
+        self.c_gps_altitude_data, self.c_voltage_data = [], []
+        self.p_pkg_data, self.p_temp_data, self.p_altitude_data = [], [], []
+        self.p_gyro_r_data, self.p_gyro_p_data, self.p_gyro_y_data = [], [], []
+        self.p_accel_r_data, self.p_accel_p_data, self.p_accel_y_data = [], [], []
+        self.p_mag_r_data, self.p_mag_p_data, self.p_mag_y_data = [], [], []
+        self.p_ptr_err_data, self.p_voltage_data = [], []
+        self.healthy_logs = {
+            'C': [CsvLog('Flight_1022_C.csv', CONTAINER_SCHEMA, 'w'),
+                  CsvLog(f'logs/{self.time_begin}_Flight_1022_C.csv', CONTAINER_SCHEMA)],
+            'T': [CsvLog('Flight_1022_T.csv', PAYLOAD_SCHEMA, 'w'),
+                  CsvLog(f'logs/{self.time_begin}_Flight_1022_T.csv', PAYLOAD_SCHEMA)],
+        }
+        self.all_logs = {
+            'C': [CsvLog('Flight_1022_C_with_corrupted.csv', CONTAINER_SCHEMA, 'w'),
+                  CsvLog(f'logs/{self.time_begin}_Flight_1022_C_with_corrupted.csv', CONTAINER_SCHEMA)],
+            'T': [CsvLog('Flight_1022_T_with_corrupted.csv', PAYLOAD_SCHEMA, 'w'),
+                  CsvLog(f'logs/{self.time_begin}_Flight_1022_T_with_corrupted.csv', PAYLOAD_SCHEMA)],
+        }
+        self.csv_logs = [log for logs in (*self.healthy_logs.values(), *self.all_logs.values())
+                         for log in logs]
+        self.dirloader = LoadDirectory(
+            'neilkml', 'neilcsv', 'csv', earth_save_name=self.time_begin, folder_name='kml')
+
+    def handleTelemetry(self, frame: Frame):
+        data = frame.data
+        if self.ui.autoscroll_check.isChecked():
+            scrollbar = self.ui.telemetry_log.verticalScrollBar()
+            scrollbar.setValue(scrollbar.maximum())
+        with open('rawfilterwithouttp.csv', 'a') as f:
+            f.write(data+'\n')
+        if frame.packet_type in self.all_logs:
+            self.ui.telemetry_log.append(f'📩 {data}')
+            for log in self.all_logs[frame.packet_type]:
+                log.append(data)
+            if frame.packet_type == 'C':
+                self.updateContainer(frame)
+            else:
+                self.updatePayload(frame)
+        else:
+            logger.warning(f'Packet of unknown origin ({frame.status}): {data}')
+
+    def updateContainer(self, frame: Frame):
+        record = frame.record
+        self.container_healthy_pkg += 1
+        self.ui.c_healthy_pkg_count.setText(str(self.container_healthy_pkg))
+        for log in self.healthy_logs['C']:
+            log.append(frame.data)
+        self.c_pkg_data.append(
+            self.container_healthy_pkg if settings.PACKET_COUNT_ORIGIN == 'local' else record.packet_count)
+        self.c_temp_data.append(record.temp)
+        self.c_altitude_data.append(record.altitude)
+        self.c_gps_altitude_data.append(record.gps_altitude)
+        self.c_voltage_data.append(record.voltage)
+        self.ui.c_state.setText(record.software_state)
+        state_progress = 0
+        if record.software_state in CONTAINER_STATES:
+            state_progress = CONTAINER_STATES.index(record.software_state) + 1
+        self.ui.stage_bar.setValue(state_progress)
+        self.c_temp_chart.plot(self.c_pkg_data, self.c_temp_data)
+        self.c_altitude_chart.plot(self.c_pkg_data, self.c_altitude_data)
+        self.c_gps_altitude_chart.plot(self.c_pkg_data, self.c_gps_altitude_data)
+        self.c_voltage_chart.plot(self.c_pkg_data, self.c_voltage_data)
+        self.ui.lat_value.setText(str(record.gps_latitude))
+        self.ui.lng_value.setText(str(record.gps_longitude))
+        self.ui.sats_value.setText(str(record.gps_sats))
+        self.dirloader.appendEarthCoord(Coordinate(
+            record.gps_latitude, record.gps_longitude, record.altitude), color='ff00ff00')
+        bat_percent = self.batteryPercentage(record.voltage)
+        self.ui.container_battery_percent.setText(f'{bat_percent.__round__(2)}%')
+        self.ui.c_battery_visual.setValue(int(bat_percent))
+        self.ui.last_cmd_value.setText(record.cmd_echo)
+
+    def updatePayload(self, frame: Frame):
+        record = frame.record
+        self.payload_healthy_pkg += 1
+        self.ui.p_healthy_pkg_count.setText(str(self.payload_healthy_pkg))
+        for log in self.healthy_logs['T']:
+            log.append(frame.data)
+        self.p_pkg_data.append(
+            self.payload_healthy_pkg if settings.PACKET_COUNT_ORIGIN == 'local' else record.packet_count)
+        self.p_temp_data.append(record.tp_temp)
+        self.p_altitude_data.append(record.tp_altitude)
+        self.p_gyro_r_data.append(record.gyro_r)
+        self.p_gyro_p_data.append(record.gyro_p)
+        self.p_gyro_y_data.append(record.gyro_y)
+        self.p_accel_r_data.append(record.accel_r)
+        self.p_accel_p_data.append(record.accel_p)
+        self.p_accel_y_data.append(record.accel_y)
+        self.p_mag_r_data.append(record.mag_r)
+        self.p_mag_p_data.append(record.mag_p)
+        self.p_mag_y_data.append(record.mag_y)
+        self.p_ptr_err_data.append(record.pointing_error)
+        self.p_voltage_data.append(record.tp_voltage)
+        self.ui.p_state.setText(record.tp_software_state)
+        self.p_temp_chart.plot(self.p_pkg_data, self.p_temp_data)
+        self.p_gyro_chart.plot(
+            self.p_pkg_data, (self.p_gyro_r_data, self.p_gyro_p_data, self.p_gyro_y_data))
+        self.p_accel_chart.plot(
+            self.p_pkg_data, (self.p_accel_r_data, self.p_accel_p_data, self.p_accel_y_data))
+        self.p_mag_chart.plot(
+            self.p_pkg_data, (self.p_mag_r_data, self.p_mag_p_data, self.p_mag_y_data))
+        self.p_ptr_err_chart.plot(self.p_pkg_data, self.p_ptr_err_data)
+        self.p_voltage_chart.plot(self.p_pkg_data, self.p_voltage_data)
+        self.p_altitude_chart.plot(self.p_pkg_data, self.p_altitude_data)
+        bat_percent = self.batteryPercentage(record.tp_voltage)
+        self.ui.payload_battery_percent.setText(f'{bat_percent.__round__(2)}%')
+        self.ui.p_battery_visual.setValue(int(bat_percent))
+
+
+def window(kind):
+    app = QApplication.instance()
+    shown = kind()
+    shown.render_timer.stop()
+    shown.port_watcher_thread.stop()
+    shown.resize(1920, 1080)
+    shown.show()
+    app.processEvents()
+    return shown
+
+
+def bench_legacy(batch: list) -> float:
+    app = QApplication.instance()
+    legacy = window(LegacyApp)
+    start = time.perf_counter()
+    for frame in batch:
+        # One signal per packet, painted before the next one
+        legacy.handleTelemetry(frame)
+        app.processEvents()
+    elapsed = time.perf_counter() - start
+    for log in legacy.csv_logs:
+        log.close()
+    legacy.recorder.close()
+    legacy.close()
+    return elapsed
+
+
+def bench_recorder(batch: list) -> float:
+    recorder = window(App).recorder
+    start = time.perf_counter()
+    for frame in batch:
+        recorder.record(frame)
+    elapsed = time.perf_counter() - start
+    recorder.close()
+    return elapsed
+
+
+def bench_slot(batch: list, rate: int) -> float:
+    # One packet per read, render() on every tick of the render timer
+    app = QApplication.instance()
+    current = window(App)
+    per_render = max(1, rate // settings.RENDER_RATE)
+    start = time.perf_counter()
+    for i, frame in enumerate(batch, 1):
+        current.handleTelemetry([frame])
+        if i % per_render == 0:
+            current.render()
+            app.processEvents()
+    elapsed = time.perf_counter() - start
+    current.recorder.close()
+    current.close()
+    return elapsed
+
+
+def main(packets: int):
+    app = QApplication.instance() or QApplication(sys.argv)
+    batch = frames(packets)
+    logger.setLevel(logging.WARNING)
+    print(f'{packets} packets, render at {settings.RENDER_RATE} Hz')
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        os.mkdir('logs')
+        rows = [('old handleTelemetry', 'GUI', bench_legacy(batch)),
+                ('TelemetryRecorder.record', 'telemetry', bench_recorder(batch))]
+        rows += [(f'new slot at {rate} packets/s', 'GUI', bench_slot(batch, rate)) for rate in RATES]
+        for name, thread, elapsed in rows:
+            print(f'{name:<32}{thread:<12}{elapsed / packets * 1e6:10.1f} us/packet')
+        app.processEvents()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,57 @@
+'''
+Resident memory of the chart data over a synthetic 24 hour session.
+
+Container packets arrive at 1 Hz and payload packets at 4 Hz, one second
+of packets per displayed batch, and the charts read their columns after
+every batch. With settings.HISTORY_RETENTION the older packets spill to
+disk and RSS stays flat, without it the stores keep growing.
+
+Run from the repository root:
+    python -m benchmarks.history [hours]
+'''
+import os
+import sys
+import tempfile
+
+from benchmarks.framer import CONTAINER as CONTAINER_LINE, PAYLOAD as PAYLOAD_LINE
+from lib.schema import CONTAINER, PAYLOAD
+from lib.store import TelemetryStore
+from settings import HISTORY_RETENTION
+
+PAGE = os.sysconf('SC_PAGE_SIZE')
+
+
+def rss() -> float:
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * PAGE / 2**20
+
+
+def session(stores: dict, hours: int):
+    container = CONTAINER.decode(CONTAINER_LINE.format(0, 0, 500.5, 0, 500.5).strip().split(','))
+    payload = PAYLOAD.decode(PAYLOAD_LINE.format(0, 0, 500.5).strip().split(','))
+    for second in range(1, hours * 3600 + 1):
+        stores['C'].append(container)
+        for _ in range(4):
+            stores['T'].append(payload)
+        stores['C']['altitude']
+        stores['T']['tp_altitude']
+        if second % 7200 == 0:
+            yield second // 3600
+
+
+def main(hours: int):
+    print(f'{hours} h session, {hours * 3600} container and {hours * 14400} payload packets')
+    with tempfile.TemporaryDirectory() as directory:
+        for name, retention in (('retention', HISTORY_RETENTION), ('unbounded', {'C': None, 'T': None})):
+            stores = {packet_type: TelemetryStore(schema, retention=retention[packet_type],
+                                                  spill_path=os.path.join(directory, f'{name}_{packet_type}.f64'))
+                      for packet_type, schema in (('C', CONTAINER), ('T', PAYLOAD))}
+            print(f'{name:<12}' + ''.join(f'{hour:>8} h' for hour in range(2, hours + 1, 2)))
+            print(f'{"RSS (MiB)":<12}' + ''.join(f'{rss():10.1f}' for _ in session(stores, hours)))
+            for store in stores.values():
+                store.close()
+            del stores
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 24)
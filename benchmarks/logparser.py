@@ -0,0 +1,64 @@
+'''
+Benchmark of loading a telemetry log.
+
+Compares classifying the lines one by one with FrameValidator against the
+column-wise lib.logparser.parse on a synthetic session with one container
+and four payload frames per second, a few percent of them corrupted.
+
+Run from the repository root:
+    python -m benchmarks.logparser [hours]
+'''
+import random
+import sys
+import time
+
+from benchmarks.framer import CONTAINER, PAYLOAD
+from lib.logparser import parse
+from lib.validation import FrameValidator
+
+
+def session(hours: float, corrupt=0.03, seed=1022):
+    rng = random.Random(seed)
+    lines = []
+    for second in range(int(hours * 3600)):
+        s = second % 60
+        lines.append(CONTAINER.format(s, second, rng.uniform(0, 700), s, rng.uniform(0, 700)))
+        for i in range(4):
+            lines.append(PAYLOAD.format(s, second * 4 + i, rng.uniform(0, 700)))
+    data = bytearray(''.join(lines).encode('ascii'))
+    for _ in range(int(len(lines) * corrupt)):
+        data[rng.randrange(len(data))] = rng.randrange(256)
+    return bytes(data)
+
+
+def bench_lines(data: bytes):
+    validator = FrameValidator()
+    healthy = []
+    for line in data.decode('ascii', 'replace').replace('\r', '\n').split('\n'):
+        if line:
+            frame = validator.classify(line)
+            if frame.healthy:
+                healthy.append(frame.record)
+    return len(healthy)
+
+
+def bench_parse(data: bytes):
+    records, _ = parse(data)
+    return sum(len(array) for array in records.values())
+
+
+def main(hours: float):
+    data = session(hours)
+    print(f'{hours} h session, {len(data)} bytes')
+    baseline = None
+    for name, bench in (('FrameValidator per line', bench_lines),
+                        ('logparser.parse', bench_parse)):
+        start = time.perf_counter()
+        healthy = bench(data)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f'{name:<28}{elapsed * 1000:10.1f} ms{healthy:10d} healthy{baseline / elapsed:8.1f}x')
+
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 3)
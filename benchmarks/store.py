@@ -0,0 +1,81 @@
+'''
+Per-packet cost and memory of the chart data of a session.
+
+Compares the per-field Python lists App.reset() used to create with
+TelemetryStore, for payload packets (14 numeric fields and the packet
+axis). After every displayed batch the payload charts slice their
+series and pyqtgraph converts them to arrays, the time includes that
+once per batch. Memory is measured with tracemalloc while the decoded
+records are discarded, as in the app.
+
+Run from the repository root:
+    python -m benchmarks.store [packets]
+'''
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.framer import PAYLOAD as LINE
+from lib.schema import PAYLOAD
+from lib.store import TelemetryStore
+
+FIELDS = ('packet_count', 'tp_altitude', 'tp_temp', 'tp_voltage', 'gyro_r', 'gyro_p', 'gyro_y',
+          'accel_r', 'accel_p', 'accel_y', 'mag_r', 'mag_p', 'mag_y', 'pointing_error')
+CHARTED = FIELDS[1:]
+
+
+def records(packets: int):
+    for i in range(packets):
+        yield PAYLOAD.decode(LINE.format(i % 60, i, i % 20000 * 0.5 + 0.01).strip().split(','))
+
+
+class Lists:
+    # App.appendPayload before TelemetryStore, kept here as the baseline
+    def __init__(self):
+        self.lists = {name: [] for name in FIELDS}
+
+    def append(self, record):
+        for name, data in self.lists.items():
+            data.append(getattr(record, name))
+
+    def __getitem__(self, name):
+        return self.lists[name]
+
+
+def plot(data):
+    # What Chart.plot and pyqtgraph do with every series
+    for name in CHARTED:
+        np.asarray(data['packet_count'][-50:-1], dtype=float)
+        np.asarray(data[name][-50:-1], dtype=float)
+
+
+def bench(data, batch: list, every: int):
+    for count, record in enumerate(batch, 1):
+        data.append(record)
+        if count % every == 0:
+            plot(data)
+    return data
+
+
+def main(packets: int):
+    batch = list(records(packets))
+    print(f'{packets} payload packets')
+    for name, store in (('per-field lists', Lists), ('TelemetryStore', lambda: TelemetryStore(PAYLOAD))):
+        timings = []
+        for every in (1, 10):
+            start = time.perf_counter()
+            bench(store(), batch, every)
+            timings.append((time.perf_counter() - start) / packets * 1e6)
+        tracemalloc.start()
+        data = bench(store(), records(packets), 10)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del data
+        print(f'{name:<20}{timings[0]:8.2f} us/packet (batches of 1){timings[1]:8.2f} us/packet (batches of 10)'
+              f'{memory / packets:8.0f} B/packet')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,164 @@
+'''
+Fixed-layout binary telemetry frames.
+
+    SYNC (2 bytes) | LENGTH (1 byte) | PAYLOAD (LENGTH bytes) | CHECKSUM (1 byte)
+
+The payload is a little-endian struct whose 4th field is the packet type
+(b'C' or b'T'), like the CSV frames. Times are sent as centiseconds since
+midnight, software states of the container as their index in
+CONTAINER_STATES. The checksum is 0xFF minus the low byte of the payload sum.
+
+Frames are decoded straight into records of lib/schema.py by toRecord(),
+their CSV text (toFields) is only made for the logs.
+'''
+
+import struct
+
+from lib.logger import logger
+from lib.schema import CONTAINER_STATES, SCHEMAS
+
+SYNC = b'\xa5\x5a'
+HEADER = struct.Struct('<2sB')
+CONTAINER = struct.Struct('<HIIccc3fI3fBB8s')
+PAYLOAD = struct.Struct('<HIIc13f10s')
+LAYOUTS = {b'C': CONTAINER, b'T': PAYLOAD}
+TYPE_OFFSET = HEADER.size + struct.calcsize('<HII')
+
+
+def checksum(payload) -> int:
+    return 0xFF - (sum(payload) & 0xFF)
+
+
+def _clock(centiseconds: int) -> str:
+    if centiseconds >= 8640000:
+        raise ValueError(f'{centiseconds} cs is not a time of day')
+    seconds, cs = divmod(centiseconds, 100)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    clock = f'{hours:02d}:{minutes:02d}:{seconds:02d}'
+    return f'{clock}.{cs:02d}' if cs else clock
+
+
+def _centiseconds(clock: str) -> int:
+    hours, minutes, seconds = clock.split(':')
+    return round((int(hours) * 3600 + int(minutes) * 60 + float(seconds)) * 100)
+
+
+def _text(raw: bytes) -> str:
+    return raw.rstrip(b'\0').decode('ascii', 'replace')
+
+
+def _state(index: int) -> str:
+    if index >= len(CONTAINER_STATES):
+        raise ValueError(f'{index} is not a container state')
+    return CONTAINER_STATES[index]
+
+
+def _shown(convert, value) -> str:
+    # Values that do not convert are logged as they came
+    try:
+        return convert(value)
+    except ValueError:
+        return str(value)
+
+
+def toRecord(values: tuple):
+    '''
+    Record of decoded values, checked against the field ranges of its
+    schema. Raises ValueError naming the first bad field. Floats are
+    rounded to the decimals of their CSV field (toFields), so records of
+    binary and ASCII frames hold the same values, without float32 noise.
+    '''
+    if values[3] == b'C':
+        (team_id, mission_time, packet_count, _, mode, tp_released, altitude, temp, voltage,
+         gps_time, latitude, longitude, gps_altitude, gps_sats, state, cmd_echo) = values
+        return SCHEMAS['C'].build((team_id, _clock(mission_time), packet_count, 'C', _text(mode), _text(tp_released),
+                                   round(altitude, 1), round(temp, 1), round(voltage, 2), _clock(gps_time),
+                                   round(latitude, 4), round(longitude, 4), round(gps_altitude, 1),
+                                   gps_sats, _state(state), _text(cmd_echo)))
+    team_id, mission_time, packet_count, _, *readings, state = values
+    return SCHEMAS['T'].build((team_id, _clock(mission_time), packet_count, 'T',
+                               *(round(value, 2) for value in readings), _text(state)))
+
+
+def toFields(values: tuple) -> list:
+    '''
+    Decoded values as the fields of a competition CSV frame, for the logs.
+    '''
+    if values[3] == b'C':
+        (team_id, mission_time, packet_count, _, mode, tp_released, altitude, temp, voltage,
+         gps_time, latitude, longitude, gps_altitude, gps_sats, state, cmd_echo) = values
+        return [str(team_id), _shown(_clock, mission_time), str(packet_count), 'C', _text(mode), _text(tp_released),
+                f'{altitude:.1f}', f'{temp:.1f}', f'{voltage:.2f}', _shown(_clock, gps_time),
+                f'{latitude:.4f}', f'{longitude:.4f}', f'{gps_altitude:.1f}', str(gps_sats),
+                _shown(_state, state), _text(cmd_echo)]
+    team_id, mission_time, packet_count, _, *readings, state = values
+    return [str(team_id), _shown(_clock, mission_time), str(packet_count), 'T',
+            *(f'{value:.2f}' for value in readings), _text(state)]
+
+
+def encode(line: str) -> bytes:
+    '''
+    Pack a CSV telemetry line into a binary frame (for simulators and tests).
+    '''
+    fields = line.strip().split(',')
+    if fields[3] == 'C':
+        payload = CONTAINER.pack(int(fields[0]), _centiseconds(fields[1]), int(fields[2]), b'C',
+                                 fields[4].encode(), fields[5].encode(),
+                                 *map(float, fields[6:9]), _centiseconds(fields[9]),
+                                 *map(float, fields[10:13]), int(fields[13]),
+                                 CONTAINER_STATES.index(fields[14]), fields[15].encode())
+    else:
+        payload = PAYLOAD.pack(int(fields[0]), _centiseconds(fields[1]), int(fields[2]), b'T',
+                               *(float(field or -1) for field in fields[4:17]), fields[17].encode())
+    return HEADER.pack(SYNC, len(payload)) + payload + bytes((checksum(payload),))
+
+
+class BinaryFramer:
+    '''
+    Reassembles binary frames from arbitrary chunks of the serial stream.
+    Bytes before a sync word and frames failing their checksum are dropped.
+    '''
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.checksum_errors = 0
+        self.discarded_bytes = 0
+
+    def feed(self, chunk: bytes) -> list:
+        '''
+        Append a chunk and return the unpacked values of every complete frame.
+        '''
+        buffer = self.buffer
+        buffer += chunk
+        records = []
+        position = 0
+        while True:
+            start = buffer.find(SYNC, position)
+            if start < 0:
+                # Keep a possible first half of the sync word
+                keep = len(buffer) - 1 if buffer.endswith(SYNC[:1]) else len(buffer)
+                self.discarded_bytes += keep - position
+                position = keep
+                break
+            self.discarded_bytes += start - position
+            if start + HEADER.size > len(buffer):
+                position = start
+                break
+            length = buffer[start + 2]
+            end = start + HEADER.size + length
+            if end >= len(buffer):
+                position = start
+                break
+            layout = LAYOUTS.get(bytes(buffer[start + TYPE_OFFSET:start + TYPE_OFFSET + 1])) \
+                if length > TYPE_OFFSET else None
+            if layout is None or layout.size != length or \
+                    checksum(memoryview(buffer)[start + HEADER.size:end]) != buffer[end]:
+                logger.warning('Dropping binary frame with bad checksum or layout')
+                self.checksum_errors += 1
+                position = start + 1
+                continue
+            records.append(layout.unpack_from(buffer, start + HEADER.size))
+            position = end + 1
+        del buffer[:position]
+        return records
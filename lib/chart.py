@@ -4,15 +4,26 @@ from PySide6.QtCore import QThread
 from PySide6.QtGui import QFont
 from typing import Union
 
+import numpy as np
+
 from lib.logger import logger
 
+SYMBOLS = 50  # longer series are drawn without symbols
+PENS = ('r', 'g', 'c')  # of the series of a 3-axis chart
+DEFAULT_PEN = (200, 200, 200)  # pyqtgraph's
+
 
 class Chart:
     def __init__(self, chart: PlotWidget, display: QLabel, unit: str = ''):
         self.chart = chart
         self.display = display
         self.unit = unit
+        self.curves = []  # PlotDataItem of each series
+        self.symbol = None
+        self.stale = False  # data changed while the chart was not visible
+        self.view_range = None  # x range zoomed into with the mouse, None follows the data
         self.formatGraph()
+        self.chart.sigXRangeChanged.connect(self.rangeChanged)
 
     def formatGraph(self):
         # graph.setTitle(title)
@@ -23,27 +34,45 @@ class Chart:
         self.chart.getAxis(
             'left').setTickFont(QFont("Consolas"))
 
-    def plot(self, x: list, y: Union[list, tuple]):
-        self.chart.clear()
-        if type(y) is tuple:
-            try:
-                self.display.setText(
-                    f'{y[0][-1]}, {y[1][-1]}, {y[2][-1]} {self.unit}')
-            except Exception as e:
-                print(f'Error setting chart text display: {e}')
-            self.chart.plot(**{'x': x[-50:-1], 'y': y[0][-50:-1],
-                               'symbol': 'o', 'symbolSize': 6, 'symbolPen': 'r', 'pen': 'r'})
-            self.chart.plot(**{'x': x[-50:-1], 'y': y[1][-50:-1],
-                               'symbol': 'o', 'symbolSize': 6, 'symbolPen': 'g', 'pen': 'g'})
-            self.chart.plot(**{'x': x[-50:-1], 'y': y[2][-50:-1],
-                               'symbol': 'o', 'symbolSize': 6, 'symbolPen': 'c', 'pen': 'c'})
-        else:
-            try:
-                self.display.setText(f'{y[-1]} {self.unit}')
-            except Exception as e:
-                print(f'Error setting chart text display: {e}')
-            self.chart.plot(**{'x': x[-50:-1], 'y': y[-50:-1],
-                               'symbol': 'o', 'symbolSize': 6})
+    def rangeChanged(self, _, x_range):
+        # Auto range is turned off by zooming or panning, on again by the A button
+        zoomed = not self.chart.getViewBox().autoRangeEnabled()[0]
+        view_range = tuple(x_range) if zoomed else None
+        if view_range != self.view_range:
+            self.view_range = view_range
+            # Decimated for the old range, redrawn at the resolution of the new one
+            self.stale = True
+
+    def visible(self) -> bool:
+        # Hidden, scrolled out of view or in a minimized window otherwise
+        return (self.chart.isVisible() and not self.chart.window().isMinimized()
+                and not self.chart.visibleRegion().isEmpty())
+
+    def plot(self, x: list, y: Union[list, tuple], latest: tuple = None):
+        # Every point is drawn, decimate long series first (TelemetryStore.decimate).
+        # The label shows latest, the values of the newest record, or the last points.
+        series = y if type(y) is tuple else (y,)
+        if latest is None:
+            latest = tuple(values[-1] for values in series)
+        try:
+            self.display.setText(f'{", ".join(map(str, latest))} {self.unit}')
+        except Exception as e:
+            print(f'Error setting chart text display: {e}')
+        if len(self.curves) != len(series):
+            # Curves are created once and updated in place afterwards
+            self.chart.clear()
+            self.curves = [self.chart.plot(pen=pen, symbolSize=6, symbolPen=pen)
+                           for pen in (PENS if len(series) > 1 else (DEFAULT_PEN,))]
+            self.symbol = None
+        symbol = 'o' if len(x) <= SYMBOLS else None
+        if symbol != self.symbol:
+            for curve in self.curves:
+                curve.setSymbol(symbol)
+            self.symbol = symbol
+        x = np.asarray(x, dtype=float)
+        for curve, values in zip(self.curves, series):
+            curve.setData(x, np.asarray(values, dtype=float))
+        self.stale = False
         return
         plottingThread = PlottingThread(
             self.chart, self.display, x, y, self.unit)
@@ -51,6 +80,10 @@ class Chart:
 
     def clear(self):
         self.chart.clear()
+        self.chart.enableAutoRange()
+        self.view_range = None
+        self.curves = []
+        self.stale = False
         self.display.setText('N/A')
 
 
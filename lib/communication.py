@@ -1,41 +1,533 @@
-from time import sleep
-from lib.port import Port
-from settings import TEAM_ID
+import asyncio
+import os
+import queue
+import sys
+import threading
+import time
+
+from collections import OrderedDict, deque
+from typing import Union
+from lib.journal import firstTimestamp
+from lib.port import AsyncPort, DisconnectException, Port, ReplayPort
+from settings import FRAME_CHECKSUM, LOW_LATENCY_SERIAL, REORDER_WINDOW, TEAM_ID, WIRE_FORMAT
 from lib.logger import logger
+from lib.uplink import UplinkQueue
+from lib.validation import FrameValidator
+
+
+class PacketMerger:
+    '''
+    Merge the frames of redundant radios. A packet is identified by
+    (PACKET_TYPE, PACKET_COUNT, MISSION_TIME), only its first copy is let
+    through. Remembers the last `window` packets, so memory stays bounded.
+    '''
+
+    def __init__(self, port_names: list, window: int = 4096):
+        self.window = window
+        self.seen = OrderedDict()  # packet key -> set of port names
+        self.unique = 0
+        self.stats = {name: {'received': 0, 'first': 0, 'duplicates': 0}
+                      for name in port_names}
+
+    def accept(self, port_name: str, fields: list):
+        '''
+        Record a frame received on port_name, return True if it is new.
+        '''
+        stats = self.stats[port_name]
+        key = fields[3], fields[2], fields[1]
+        ports = self.seen.get(key)
+        if ports is None:
+            self.seen[key] = {port_name}
+            if len(self.seen) > self.window:
+                self.seen.popitem(last=False)
+            self.unique += 1
+            stats['received'] += 1
+            stats['first'] += 1
+            return True
+        if port_name in ports:
+            stats['duplicates'] += 1
+        else:
+            ports.add(port_name)
+            stats['received'] += 1
+        return False
+
+    def lossRate(self, port_name: str):
+        '''
+        Fraction of the merged packets that never arrived on port_name.
+        '''
+        if not self.unique:
+            return 0.0
+        return 1 - self.stats[port_name]['received'] / self.unique
+
+    def report(self):
+        lines = [f'{self.unique} unique packets merged']
+        for name, stats in self.stats.items():
+            lines.append(f'{name}: {stats["received"]} received, {stats["first"]} first, '
+                         f'{stats["duplicates"]} self-duplicates, {self.lossRate(name) * 100:.1f}% lost')
+        return '\n'.join(lines)
+
+
+class ReorderBuffer:
+    '''
+    Jitter buffer of one packet stream (C or T), keyed on PACKET_COUNT.
+    Duplicates are dropped and packets are released in order. A packet
+    waits for the missing ones before it until `window` packets are held
+    or it has waited max_delay seconds, then the gap is given up on.
+    Counts far behind the stream mean the probe restarted counting, the
+    stream then follows them. Memory is bounded by the window.
+    '''
+
+    def __init__(self, window: int = 8, max_delay: float = 1.0):
+        self.window = window
+        self.max_delay = max_delay
+        self.history = 4 * window
+        self.next = None  # packet count to release next
+        self.pending = {}  # packet count -> (arrival time, frame)
+        self.recent = deque(maxlen=self.history)  # packet counts released last
+        self.stats = {'released': 0, 'duplicates': 0, 'late': 0,
+                      'held': 0, 'skipped': 0, 'restarts': 0}
+
+    def push(self, count: int, frame, now: float = None) -> list:
+        '''
+        Add the frame of packet count, return the frames released by it in
+        order (possibly none).
+        '''
+        now = time.monotonic() if now is None else now
+        stats = self.stats
+        released = []
+        if self.next is not None and count < self.next:
+            if count >= self.next - self.history:
+                stats['duplicates' if count in self.recent else 'late'] += 1
+                return released
+            logger.warning(f'PACKET_COUNT went back from {self.next - 1} to {count}, restarting stream')
+            stats['restarts'] += 1
+            released = self._release(now, flush=True)
+            self.next = None
+        if count in self.pending:
+            stats['duplicates'] += 1
+            return released
+        if self.next is None:
+            self.next = count
+        elif count > self.next:
+            stats['held'] += 1
+        self.pending[count] = (now, frame)
+        return released + self._release(now)
+
+    def poll(self, now: float = None) -> list:
+        '''
+        Frames that have waited long enough for a gap before them.
+        '''
+        return self._release(time.monotonic() if now is None else now)
+
+    def flush(self) -> list:
+        '''
+        Every held frame in order, gaps given up on. For the end of a session.
+        '''
+        return self._release(time.monotonic(), flush=True)
+
+    def _release(self, now: float, flush: bool = False) -> list:
+        released = []
+        pending = self.pending
+        while pending:
+            frame = pending.pop(self.next, None)
+            if frame is not None:
+                released.append(frame[1])
+                self.recent.append(self.next)
+                self.next += 1
+                continue
+            first = min(pending)
+            if not flush and len(pending) < self.window and now - pending[first][0] < self.max_delay:
+                break
+            self.stats['skipped'] += first - self.next
+            self.next = first
+        self.stats['released'] += len(released)
+        return released
+
+
+class PortGeneration:
+    '''
+    The ports opened together by one openPorts() call, with the queue their
+    reader threads feed, the ports still alive and the event that stops the
+    readers. Swapping ports replaces the whole generation, so readers of the
+    old one can never feed or end the new one.
+    '''
+    WAKE = None  # put into the queue when the generation is closed
+
+    def __init__(self, ports: list):
+        self.ports = ports
+        self.queue = queue.Queue()
+        self.readers = None
+        self.alive = {port.port_name for port in ports}
+        self.stopped = threading.Event()
+
+    def close(self):
+        self.stopped.set()
+        # Wake the consumer blocked on this queue, it moves on to the next generation
+        self.queue.put(self.WAKE)
+        for port in self.ports:
+            port.destroy()
+
+
+class OutageLog:
+    '''
+    Reconnect statistics of every radio link, used to measure downtime.
+    '''
+
+    def __init__(self):
+        self.outages = 0
+        self.total_downtime = 0.0
+        self.longest_downtime = 0.0
+
+    def lost(self, port: Port):
+        logger.warning(f'Lost {port.port_name}, reconnecting ...')
+        return time.monotonic(), port.last_frame_time
+
+    def restored(self, port: Port, outage: tuple, attempts: int):
+        lost_time, last_frame_time = outage
+        downtime = time.monotonic() - lost_time
+        self.outages += 1
+        self.total_downtime += downtime
+        self.longest_downtime = max(self.longest_downtime, downtime)
+        gap = f', {lost_time - last_frame_time:.2f} s without frames before' if last_frame_time else ''
+        logger.info(f'Reconnected to {port.port_name} after {downtime:.2f} s and {attempts} attempts{gap}')
+
+    def report(self):
+        return (f'{self.outages} reconnects, {self.total_downtime:.2f} s total downtime, '
+                f'longest {self.longest_downtime:.2f} s')
 
 
 class TelemetryHandler:
     terminating_char = '\r'
+    port_class = Port
+    reconnect_delay = 0.1  # first retry delay in seconds, doubled on every failure
+    max_reconnect_delay = 5.0
+    poll_interval = 0.25  # seconds, reads time out this often so a quiet link still releases held packets
+
+    def __init__(self, port_names: Union[str, list], journal_prefix: str = None) -> None:
+        self.journal_prefix = journal_prefix
+        self.outage_log = OutageLog()
+        self.validator = FrameValidator(
+            checksum=FRAME_CHECKSUM and WIRE_FORMAT != 'binary')
+        self.uplink = UplinkQueue(lambda text: self.port.write(text))
+        self.closed = False  # destroyed, no more ports will be opened
+        self._swap = threading.Lock()  # held while setPort replaces the generation
+        # Kept across setPort, packets held when the ports are swapped are not lost
+        self.reorder = {packet_type: ReorderBuffer(REORDER_WINDOW)
+                        for packet_type in ('C', 'T')} if REORDER_WINDOW > 0 else {}
+        self.openPorts(port_names)
 
-    def __init__(self, port_name: str) -> None:
-        self.port = Port(port_name, self.terminating_char, baudrate=115200)
-        self.port.connect()
+    def openPorts(self, port_names: Union[str, list]):
+        '''
+        Open every port in port_names. The first one is the primary radio
+        and also carries the uplink, the others are receive-only backups.
+        '''
+        if isinstance(port_names, str):
+            port_names = [port_names]
+        port_names = list(dict.fromkeys(port_names))
+        self.ports = [self.port_class(name, self.terminating_char, baudrate=115200, wire_format=WIRE_FORMAT,
+                                      journal_path=self.journalPath(name), low_latency=LOW_LATENCY_SERIAL,
+                                      timeout=self.poll_interval)
+                      for name in port_names]
+        for port in self.ports:
+            port.connect()
+        self.port = self.ports[0]
+        self.generation = PortGeneration(self.ports)
+        self.merger = PacketMerger(port_names)
+        self._pending = deque()
+
+    def journalPath(self, port_name: str):
+        '''
+        Raw byte journal of port_name, None when journaling is off.
+        '''
+        if self.journal_prefix is None:
+            return None
+        return f'{self.journal_prefix}_{os.path.basename(port_name)}.journal'
+
+    def _current(self) -> PortGeneration:
+        '''
+        The generation to read from. A closed one is being replaced by
+        setPort, wait for its successor, unless the handler is destroyed.
+        '''
+        generation = self.generation
+        if generation.stopped.is_set():
+            if self.closed:
+                raise DisconnectException
+            with self._swap:
+                generation = self.generation
+        return generation
 
     def read(self):
-        data = self.port.read()
-        logger.debug(f'Incoming telemetry: {data}')
-        return data
+        while not self._pending:
+            self._pending.extend(self.frames())
+        return self._pending.popleft()
+
+    def frames(self):
+        # Ports may be swapped while this waits, it only ever reads the generation it started with
+        generation = self._current()
+        if len(generation.ports) == 1:
+            port = generation.ports[0]
+            quiet = True
+            try:
+                for data in port.frames():
+                    quiet = False
+                    logger.debug(f'Incoming telemetry: {data}')
+                    yield from self._order(self._classify(data, port.rssi))
+            except DisconnectException:
+                # A port closed on purpose is not a lost link
+                if generation.stopped.is_set():
+                    return
+                if not self._reconnect(port, generation.stopped) and not generation.stopped.is_set():
+                    raise
+                return
+            if quiet:
+                # The read timed out, held packets may be due
+                yield from self.poll()
+            return
+        if generation.readers is None:
+            generation.readers = [threading.Thread(target=self._readPort, args=(port, generation), daemon=True)
+                                  for port in generation.ports]
+            for reader in generation.readers:
+                reader.start()
+        try:
+            item = generation.queue.get(timeout=self.poll_interval)
+        except queue.Empty:
+            yield from self.poll()
+            return
+        while item is not PortGeneration.WAKE:
+            frame = self._merge(generation, *item)
+            if frame is not None:
+                yield from self._order(frame)
+            try:
+                item = generation.queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def _readPort(self, port: Port, generation: PortGeneration):
+        while not generation.stopped.is_set():
+            try:
+                for data in port.frames():
+                    generation.queue.put((port.port_name, data, port.rssi))
+            except DisconnectException:
+                if generation.stopped.is_set():
+                    return
+                if not self._reconnect(port, generation.stopped):
+                    # Only a lost link ends the port, a stop is not reported as one
+                    if not generation.stopped.is_set():
+                        generation.queue.put((port.port_name, None, None))
+                    return
+
+    def _reconnectDelays(self, stopped: threading.Event):
+        delay = self.reconnect_delay
+        while not stopped.is_set():
+            yield delay
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _reconnect(self, port: Port, stopped: threading.Event):
+        '''
+        Reopen port with exponential backoff. Blocks until the device is back
+        and returns True, or returns False once stopped is set (the port was
+        closed on purpose). A port that never opened is not retried, a
+        START without a radio halts as a failed connect.
+        '''
+        if not port.opened:
+            return False
+        outage = self.outage_log.lost(port)
+        for attempt, delay in enumerate(self._reconnectDelays(stopped), 1):
+            if port.reconnect():
+                if stopped.is_set():
+                    # Closed while reopening, the device belongs to the next generation now
+                    port.destroy()
+                    return False
+                self.outage_log.restored(port, outage, attempt)
+                return True
+            stopped.wait(delay)
+        return False
+
+    def _merge(self, generation: PortGeneration, port_name: str, data: str, rssi: int = None):
+        if data is None:
+            logger.warning(f'Radio on {port_name} disconnected')
+            generation.alive.discard(port_name)
+            if not generation.alive:
+                raise DisconnectException
+            return
+        logger.debug(f'Incoming telemetry ({port_name}): {data}')
+        frame = self._classify(data, rssi)
+        # Damaged copies are not deduplicated, a healthy one may still arrive
+        if not frame.healthy or self.merger.accept(port_name, frame.fields):
+            return frame
+
+    def _order(self, frame) -> list:
+        '''
+        Frames to hand on for frame: healthy ones go through the reorder
+        buffer of their stream, damaged ones are passed on at once.
+        '''
+        if not self.reorder:
+            return [frame]
+        now = time.monotonic()
+        buffer = self.reorder.get(frame.packet_type) if frame.healthy else None
+        frames = [frame] if buffer is None else buffer.push(frame.record.packet_count, frame, now)
+        # Any frame is a clock tick for the other stream
+        for other in self.reorder.values():
+            if other is not buffer:
+                frames += other.poll(now)
+        return frames
+
+    def poll(self) -> list:
+        '''
+        Held frames whose wait for a gap ran out while nothing arrived.
+        '''
+        now = time.monotonic()
+        return [frame for buffer in self.reorder.values() for frame in buffer.poll(now)]
+
+    def flush(self) -> list:
+        '''
+        Every frame still held by the reorder buffers, once reading stopped.
+        '''
+        return [frame for buffer in self.reorder.values() for frame in buffer.flush()]
+
+    def _classify(self, data: str, rssi: int = None):
+        frame = self.validator.classify(data)
+        frame.rssi = rssi
+        if frame.healthy and frame.packet_type == 'C':
+            self.uplink.acknowledge(frame.record.cmd_echo)
+        return frame
 
     def sendCommand(self, command: str, data: str = ''):
         self.sendRawCommand(f'CMD,{TEAM_ID},{command},{data}\r')
 
     def sendRawCommand(self, text: str):
-        for i in range(2):
-            self.port.write(text)
-        # sleep(0.1)
-        logger.info(f'Outgoing telemetry: {text}')
+        '''
+        Queue text for the uplink. Commands (CMD,<TEAM_ID>,<COMMAND>,<DATA>)
+        are prioritized by command and tracked until they are echoed.
+        '''
+        fields = text.strip().split(',')
+        if len(fields) >= 3 and fields[0] == 'CMD':
+            self.uplink.submit(text, ''.join(fields[2:]),
+                               UplinkQueue.priorityOf(fields[2]))
+        else:
+            self.uplink.submit(text)
 
     @staticmethod
     def previewSendCommand(command: str, data: str = ''):
         return f'CMD,{TEAM_ID},{command},{data}\r'
 
     def setPort(self, port_name: str):
-        self.port.destroy()
-        self.port = Port(port_name, self.terminating_char)
-        self.port.connect()
+        '''
+        Swap the primary radio, backups are kept.
+        '''
+        backups = [port.port_name for port in self.ports[1:]]
+        with self._swap:
+            self.closePorts()
+            self.openPorts([port_name] + backups)
+
+    def metrics(self):
+        '''
+        Snapshot of the link counters of every radio and of frame validation.
+        '''
+        return {
+            'ports': {port.port_name: port.metrics.snapshot() for port in self.ports},
+            'frame_status': dict(self.validator.counts),
+            'merge': {'unique': self.merger.unique, 'ports': self.merger.stats},
+            'reorder': {packet_type: buffer.stats for packet_type, buffer in self.reorder.items()},
+            'outages': vars(self.outage_log),
+            'uplink': self.uplink.snapshot(),
+        }
+
+    def metricsSummary(self):
+        return ' | '.join(f'{port.port_name}: {port.metrics.summary()}' for port in self.ports)
+
+    def closePorts(self):
+        self.generation.close()
 
     def destroy(self):
-        self.port.destroy()
+        self.closed = True
+        self.uplink.stop()
+        self.closePorts()
+        if self.outage_log.outages:
+            logger.info(f'Radio link summary: {self.outage_log.report()}')
+        if len(self.merger.stats) > 1:
+            logger.info(f'Redundant radio summary:\n{self.merger.report()}')
+
+
+class AsyncTelemetryHandler(TelemetryHandler):
+    '''
+    TelemetryHandler on top of AsyncPort, to be consumed from an asyncio
+    event loop (e.g. qasync's QEventLoop) instead of a blocking QThread.
+    '''
+    supported = not sys.platform.startswith('win')
+    port_class = AsyncPort
+
+    async def frames(self):
+        generation = self._current()
+        incoming = asyncio.Queue()
+
+        async def pump(port: AsyncPort):
+            while not generation.stopped.is_set():
+                try:
+                    async for data in port.frames():
+                        incoming.put_nowait((port.port_name, data, port.rssi))
+                except DisconnectException:
+                    if generation.stopped.is_set():
+                        return
+                    if not await self._reconnectAsync(port, generation.stopped):
+                        if not generation.stopped.is_set():
+                            incoming.put_nowait((port.port_name, None, None))
+                        return
+
+        # A single radio is pumped too, so held packets are released on time either way
+        pumps = [asyncio.ensure_future(pump(port)) for port in generation.ports]
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(incoming.get(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    for frame in self.poll():
+                        yield frame
+                    continue
+                frame = self._merge(generation, *item)
+                if frame is not None:
+                    for frame in self._order(frame):
+                        yield frame
+        finally:
+            for task in pumps:
+                task.cancel()
+
+    async def _reconnectAsync(self, port: AsyncPort, stopped: threading.Event):
+        if not port.opened:
+            return False
+        outage = self.outage_log.lost(port)
+        for attempt, delay in enumerate(self._reconnectDelays(stopped), 1):
+            if port.reconnect():
+                if stopped.is_set():
+                    port.destroy()
+                    return False
+                self.outage_log.restored(port, outage, attempt)
+                return True
+            await asyncio.sleep(delay)
+        return False
+
+
+class ReplayTelemetryHandler(TelemetryHandler):
+    '''
+    TelemetryHandler fed from raw byte journals (see lib/journal.py) instead
+    of radios. speed scales the recorded timing, 0 replays as fast as
+    possible. The end of a journal ends its port, there is nothing to
+    reconnect to.
+    '''
+
+    def __init__(self, journal_paths: Union[str, list], speed: float = 1.0) -> None:
+        if isinstance(journal_paths, str):
+            journal_paths = [journal_paths]
+        self.speed = speed
+        # Journals of one session share the monotonic clock, keep them in step
+        self.origin = min(filter(None, map(firstTimestamp, journal_paths)), default=None)
+        super().__init__(journal_paths)
+
+    def port_class(self, *args, **kwargs):
+        return ReplayPort(*args, speed=self.speed, origin=self.origin, **kwargs)
+
+    def _reconnect(self, port: Port, stopped: threading.Event):
+        return False
 
 
 if __name__ == '__main__':
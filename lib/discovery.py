@@ -0,0 +1,109 @@
+import glob
+import os
+import serial
+import tempfile
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor, wait
+from serial.tools import list_ports
+from lib.logger import logger
+
+# Pseudo-terminals of lib/virtualradio.py are linked here, /dev/pts is not
+# listed by serial.tools.list_ports
+VIRTUAL_PORT_PATTERN = os.path.join(tempfile.gettempdir(), 'ttyVIRTUAL*')
+
+
+class PortDiscovery:
+    '''
+    Serial port discovery from OS metadata (sysfs, IOKit or SetupAPI through
+    serial.tools.list_ports), so devices do not have to be opened just to be
+    listed. Candidates can be probed in parallel with a short timeout and
+    results are cached until refreshed. Ports held open by this process
+    (the radios of the TelemetryHandler) are never probed, opening them
+    again would fight the reader for the device.
+    '''
+    ignored = ('/dev/tty.Bluetooth-Incoming-Port',)
+
+    def __init__(self, probe_timeout: float = 0.5, workers: int = 8):
+        self.probe_timeout = probe_timeout
+        self.workers = workers
+        self._ports = None
+        self._devices = None
+        self._lock = threading.Lock()
+        self.in_use = set()  # port names opened by Port.connect
+
+    def enumerate(self):
+        '''
+        List device names without opening anything.
+        '''
+        devices = [port.device for port in list_ports.comports()
+                   if port.device not in self.ignored]
+        # Stale links of virtual radios that exited fail os.path.exists
+        devices += filter(os.path.exists, glob.glob(VIRTUAL_PORT_PATTERN))
+        return sorted(devices)
+
+    def hold(self, port_name: str):
+        self.in_use.add(port_name)
+
+    def release(self, port_name: str):
+        self.in_use.discard(port_name)
+
+    @staticmethod
+    def _open(port_name: str):
+        device = serial.Serial(port_name, timeout=0)
+        device.close()
+
+    def probe(self, port_names: list):
+        '''
+        Open every candidate in parallel and keep those that open within
+        probe_timeout. Slow devices are dropped rather than waited on.
+        '''
+        if not port_names:
+            return []
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.workers, len(port_names)))
+        futures = {name: executor.submit(self._open, name)
+                   for name in port_names}
+        wait(futures.values(), timeout=self.probe_timeout)
+        executor.shutdown(wait=False)
+        result = []
+        for name, future in futures.items():
+            if not future.done():
+                logger.warning(f'Port check timed out ({name})')
+            elif future.exception() is None:
+                result.append(name)
+            elif not isinstance(future.exception(), serial.SerialException):
+                logger.error(
+                    f'An error occured during port check ({name}): {future.exception()}')
+        return result
+
+    def list(self, refresh: bool = False, probe: bool = True):
+        with self._lock:
+            if self._ports is None or refresh:
+                start = time.perf_counter()
+                self._devices = self.enumerate()
+                if probe:
+                    # Ports in use are known to work
+                    in_use = set(self.in_use)
+                    probed = set(self.probe([name for name in self._devices if name not in in_use]))
+                    self._ports = [name for name in self._devices if name in in_use or name in probed]
+                else:
+                    self._ports = self._devices
+                logger.debug(
+                    f'Port discovery took {(time.perf_counter() - start) * 1000:.0f} ms')
+            return list(self._ports)
+
+    def poll(self):
+        '''
+        Cheap hotplug check. Re-enumerates device metadata and only probes
+        again when a device was added or removed. Returns the new port list,
+        or None when nothing changed.
+        '''
+        devices = self.enumerate()
+        if devices == self._devices:
+            return None
+        return self.list(refresh=True)
+
+
+discovery = PortDiscovery()
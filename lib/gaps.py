@@ -0,0 +1,172 @@
+'''
+Packet loss of a telemetry stream, from the gaps in its PACKET_COUNT.
+
+A packet counts as missing when no healthy copy of it arrived, corrupted
+copies included. Every update is O(1), apart from late packets, which look
+for their gap from the newest one: missing ranges are kept for the last
+max_ranges gaps only, the rolling loss covers the last `window` received
+packets and loss by altitude is binned.
+'''
+
+import time
+
+from collections import deque
+
+
+class GapTracker:
+    '''
+    Feed the packets of one stream with packet(), in order if possible (see
+    ReorderBuffer). Duplicates are ignored and a late packet is taken out of
+    its gap. Only a count going back by more than restart_threshold is
+    taken as a restart of the probe.
+    '''
+
+    def __init__(self, window: int = 100, altitude_bin: float = 100.0, max_ranges: int = 1000,
+                 restart_threshold: int = 32):
+        self.window = window
+        self.altitude_bin = altitude_bin
+        self.restart_threshold = restart_threshold
+        self.received = 0
+        self.missing = 0
+        self.duplicates = 0
+        self.restarts = 0
+        # [first, last, seconds, altitude bin, received index of the packet after it] of each gap
+        self._gaps = deque(maxlen=max_ranges)
+        self.longest = None  # (packets, seconds, first, last) of the longest outage
+        self.altitudes = {}  # lowest altitude of the bin -> [received, missing]
+        self._last = None  # (packet count, altitude, arrival time) of the highest count
+        self._recent = deque()  # packets missing before each of the last `window` packets
+        self._recent_missing = 0
+        self._restarted = 0  # received index of the last restart, older gaps stay closed
+
+    @property
+    def ranges(self) -> list:
+        '''
+        (first, last) packet count of every missing range.
+        '''
+        return [(first, last) for first, last, *_ in self._gaps]
+
+    def packet(self, count: int, altitude: float, now: float = None):
+        now = time.monotonic() if now is None else now
+        missing = 0
+        if self._last is not None:
+            last_count, last_altitude, last_time = self._last
+            missing = count - last_count - 1
+            if missing < 0:
+                if last_count - count <= self.restart_threshold:
+                    self._late(count, altitude)
+                    return
+                self.restarts += 1
+                self._restarted = self.received + 1
+                missing = 0
+            elif missing:
+                self.missing += missing
+                # Lost somewhere between the packets around the gap
+                lowest = self._lowest((last_altitude + altitude) / 2)
+                self._bin(lowest)[1] += missing
+                self._gaps.append([last_count + 1, count - 1, now - last_time, lowest, self.received + 1])
+                outage = (missing, now - last_time, last_count + 1, count - 1)
+                if self.longest is None or outage[:2] > self.longest[:2]:
+                    self.longest = outage
+        self._received(altitude, missing)
+        self._last = count, altitude, now
+
+    def _received(self, altitude: float, missing: int):
+        self.received += 1
+        self._bin(self._lowest(altitude))[0] += 1
+        self._recent.append(missing)
+        self._recent_missing += missing
+        if len(self._recent) > self.window:
+            self._recent_missing -= self._recent.popleft()
+
+    def _late(self, count: int, altitude: float):
+        '''
+        Take a packet older than the newest one out of its gap, or ignore
+        it as a duplicate when it is in none.
+        '''
+        gaps = self._gaps
+        for index in range(len(gaps) - 1, -1, -1):
+            gap = gaps[index]
+            first, last, seconds, lowest, after = gap
+            if after <= self._restarted or last < count:
+                break
+            if count < first:
+                continue
+            self.missing -= 1
+            counts = self._bin(lowest)
+            counts[1] -= 1
+            if counts == [0, 0]:
+                del self.altitudes[lowest]
+            # The gap was counted before the packet after it, if that is still in the window
+            position = len(self._recent) - 1 - (self.received - after)
+            if position >= 0:
+                self._recent[position] -= 1
+                self._recent_missing -= 1
+            # Pro rata, the seconds of each part of a split gap are not known
+            packets = last - first + 1
+            parts = [[part_first, part_last, seconds * (part_last - part_first + 1) / packets, lowest, after]
+                     for part_first, part_last in ((first, count - 1), (count + 1, last))
+                     if part_first <= part_last]
+            del gaps[index]
+            for part in reversed(parts):
+                gaps.insert(index, part)
+            if self.longest is not None and self.longest[2:] == (first, last):
+                self.longest = max(((part_last - part_first + 1, part_seconds, part_first, part_last)
+                                    for part_first, part_last, part_seconds, *_ in gaps),
+                                   key=lambda outage: outage[:2], default=None)
+            self._received(altitude, 0)
+            return
+        self.duplicates += 1
+
+    def _lowest(self, altitude: float) -> float:
+        return altitude // self.altitude_bin * self.altitude_bin
+
+    def _bin(self, lowest: float) -> list:
+        counts = self.altitudes.get(lowest)
+        if counts is None:
+            counts = self.altitudes[lowest] = [0, 0]
+        return counts
+
+    def lossRate(self) -> float:
+        expected = self.received + self.missing
+        return self.missing / expected if expected else 0.0
+
+    def rollingLossRate(self) -> float:
+        '''
+        Loss over the last `window` received packets and the gaps before them.
+        '''
+        expected = len(self._recent) + self._recent_missing
+        return self._recent_missing / expected if expected else 0.0
+
+    def lossByAltitude(self) -> list:
+        '''
+        (lowest altitude, received, missing, loss rate) of every altitude bin.
+        '''
+        return [(lowest, received, missing, missing / (received + missing))
+                for lowest, (received, missing) in sorted(self.altitudes.items())]
+
+    def label(self) -> str:
+        return f'{self.missing} ({self.rollingLossRate() * 100:.1f}%)'
+
+    def summary(self) -> str:
+        summary = (f'{self.received} received, {self.missing} missing ({self.lossRate() * 100:.1f}%), '
+                   f'{self.rollingLossRate() * 100:.1f}% over the last {self.window}')
+        if self.longest is not None:
+            packets, seconds, first, last = self.longest
+            summary += f', longest outage {packets} packets ({first}-{last}) in {seconds:.1f} s'
+        return summary
+
+    def snapshot(self):
+        return {
+            'received': self.received,
+            'missing': self.missing,
+            'loss_rate': self.lossRate(),
+            'rolling_loss_rate': self.rollingLossRate(),
+            'duplicates': self.duplicates,
+            'restarts': self.restarts,
+            'longest_outage': None if self.longest is None else dict(
+                zip(('packets', 'seconds', 'first', 'last'), self.longest)),
+            'missing_ranges': self.ranges,
+            'loss_by_altitude': [dict(zip(('altitude', 'received', 'missing', 'loss_rate'), row))
+                                 for row in self.lossByAltitude()],
+        }
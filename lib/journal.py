@@ -0,0 +1,177 @@
+'''
+Append-only journal of the raw bytes received from a radio.
+
+Every chunk read by Port is stored untouched, before any framing, filtering
+or decoding, together with its time.monotonic_ns() arrival time:
+
+    header   b'GCSJ' + version (1 byte)
+    record   '<qI' timestamp (ns), length, followed by length bytes
+
+A journal is replayed through the normal receive path with
+ReplayTelemetryHandler, at the original timing or N times faster:
+
+    python -m lib.journal logs/<time>_COM10.journal --speed 10
+'''
+
+import argparse
+import os
+import struct
+import time
+
+from serial.serialutil import SerialException
+from lib.logger import logger
+
+MAGIC = b'GCSJ\x01'
+RECORD = struct.Struct('<qI')
+
+
+class Journal:
+    '''
+    Writer side, one journal per port. Records are flushed as they are
+    written, so a crash loses at most the chunk being written.
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, 'ab', buffering=0)
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.bytes_written = 0
+
+    def write(self, chunk, timestamp_ns: int = None):
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        self.file.write(RECORD.pack(timestamp_ns, len(chunk)) + bytes(chunk))
+        self.bytes_written += len(chunk)
+
+    def close(self):
+        self.file.close()
+
+
+def records(path: str):
+    '''
+    Iterate over the (timestamp_ns, chunk) records of a journal. A record cut
+    short by a crash ends the iteration.
+    '''
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} is not a raw byte journal')
+        while True:
+            header = file.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            timestamp, length = RECORD.unpack(header)
+            chunk = file.read(length)
+            if len(chunk) < length:
+                logger.warning(f'Journal {path} ends in a partial record')
+                return
+            yield timestamp, chunk
+
+
+def firstTimestamp(path: str):
+    for timestamp, _ in records(path):
+        return timestamp
+
+
+class ReplayDevice:
+    '''
+    Stand-in for serial.Serial that hands out the chunks of a journal when
+    they are due. speed scales the original timing, 0 replays as fast as the
+    reader can go. Timing is relative to origin (ns), the first record by
+    default; pass a common origin to keep several journals in step.
+    Raises SerialException at the end, like an unplugged radio.
+    '''
+
+    def __init__(self, path: str, speed: float = 1.0, origin: int = None):
+        self.path = path
+        self.speed = speed
+        self._records = records(path)
+        self._chunk = b''
+        self._due = 0.0
+        self._first = origin
+        self._start = time.monotonic()
+        self.is_open = True
+
+    def _advance(self):
+        '''
+        Load the next chunk once the current one is used up, return False at
+        the end of the journal.
+        '''
+        while not self._chunk:
+            record = next(self._records, None)
+            if record is None:
+                return False
+            timestamp, self._chunk = record
+            if self._first is None:
+                self._first = timestamp
+            offset = (timestamp - self._first) / 1e9
+            self._due = self._start + (offset / self.speed if self.speed else 0.0)
+        return True
+
+    @property
+    def in_waiting(self):
+        if not self._advance() or time.monotonic() < self._due:
+            return 0
+        return len(self._chunk)
+
+    def read(self, size: int = 1):
+        if not self._advance():
+            raise SerialException(f'End of journal {self.path}')
+        delay = self._due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        data, self._chunk = self._chunk[:size], self._chunk[size:]
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def write(self, data: bytes):
+        # Uplink commands have nowhere to go during a replay
+        return len(data)
+
+    def close(self):
+        self.is_open = False
+
+
+def main():
+    from lib.communication import ReplayTelemetryHandler
+    from lib.port import DisconnectException
+
+    parser = argparse.ArgumentParser(
+        description='Replay raw byte journals through the telemetry pipeline.')
+    parser.add_argument('journals', nargs='+',
+                        help='journal files, the first is the primary radio')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='replay speed, 1 is the original timing, 0 is as fast as possible')
+    parser.add_argument('--print', action='store_true',
+                        help='print every frame')
+    args = parser.parse_args()
+
+    telemetry = ReplayTelemetryHandler(args.journals, speed=args.speed)
+    start = time.perf_counter()
+    frames = 0
+    try:
+        while True:
+            for frame in telemetry.frames():
+                frames += 1
+                if args.print:
+                    print(frame.status, frame.data)
+    except KeyboardInterrupt:
+        pass
+    except DisconnectException:
+        logger.info('Replay finished')
+    elapsed = time.perf_counter() - start
+    logger.info(f'{frames} frames in {elapsed:.2f} s ({frames / elapsed:.0f} frames/s), '
+                f'status {dict(telemetry.validator.counts)}')
+    logger.info(telemetry.metricsSummary())
+    telemetry.destroy()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+'''
+Batch parser of telemetry logs into NumPy structured arrays.
+
+A whole log (or any chunk of CSV frames) is parsed column by column
+instead of line by line: lines are bucketed by their number of fields,
+every bucket is split into a 2-D array of fields with a single split and
+each column is parsed from its raw bytes with a few NumPy operations per
+character position. Only values spelled in an unusual way (exponents,
+spaces) or corrupted ones are looked at one by one, so corrupted lines
+cost time in proportion to how many there are.
+
+Lines are accepted exactly when FrameValidator would call them healthy,
+except that lines containing NUL bytes are always rejected; headers,
+truncated and malformed lines are counted as rejected. Records of
+both packet types come out of the same pass, with the dtype of their schema:
+
+    records, rejected = load('logs/2022-06-25T13_02_00_Flight_1022_C.csv')
+    altitude = records['C']['altitude']
+
+    python -m lib.logparser withtp.csv logs/*.csv
+'''
+
+import argparse
+import time
+from itertools import compress, repeat
+
+import numpy as np
+
+from lib.logger import logger
+from lib.schema import CLOCK, SCHEMAS, TEXT, clock
+
+MAX_LINE = 512  # bytes, longer lines cannot be frames
+FIELD_WIDTH = 32  # bytes, rows with a longer field are rejected
+MAX_DIGITS = 15  # longer numbers are parsed by float()/int(), exactness needs m < 2**53
+
+
+def _fallback(column: np.ndarray, parse) -> np.ndarray:
+    '''
+    Mask of the values of column that parse() accepts, one by one.
+    '''
+    valid = np.ones(len(column), dtype=bool)
+    for index, value in enumerate(column):
+        try:
+            parse(value.decode('ascii'))
+        except (ValueError, UnicodeDecodeError):
+            valid[index] = False
+    return valid
+
+
+def _bytes(column: np.ndarray) -> np.ndarray:
+    '''
+    (rows, width) uint8 view of a bytes column, short values are NUL padded.
+    '''
+    column = np.ascontiguousarray(column)
+    return column.view(np.uint8).reshape(len(column), column.dtype.itemsize)
+
+
+def _decimals(column: np.ndarray, field):
+    '''
+    Parse [+-]digits[.digits] on the raw bytes of a whole column at once:
+    the digits form an integer mantissa m and the value is m / 10**k, which
+    is exactly what float() returns as long as m is exact. Values in any
+    other spelling (exponents, spaces, nan) go through field.type.
+    Returns the values and the mask of valid ones.
+    '''
+    raw = _bytes(column)
+    # Drop the padding that is NUL in every row
+    used = np.flatnonzero(raw.any(axis=0))
+    raw = raw[:, :used[-1] + 1 if used.size else 1]
+    rows = len(raw)
+    negative = raw[:, 0] == ord('-')
+    # Wraps around, only the digits become 0..9
+    value = raw - np.uint8(ord('0'))
+    canonical = np.ones(rows, dtype=bool)
+    dotted = np.zeros(rows, dtype=bool)
+    mantissa = np.zeros(rows, dtype=np.int64)
+    digits = np.zeros(rows, dtype=np.int64)
+    decimals = np.zeros(rows, dtype=np.int64)
+    for position in range(raw.shape[1]):
+        byte = raw[:, position]
+        digit = value[:, position] <= 9
+        dot = byte == ord('.')
+        allowed = digit | dot | (byte == 0)
+        if position == 0:
+            allowed |= negative | (byte == ord('+'))
+        canonical &= allowed & ~(dot & dotted)
+        dotted |= dot
+        mantissa = np.where(digit, mantissa * 10 + value[:, position], mantissa)
+        digits += digit
+        decimals += digit & dotted
+    canonical &= (digits > 0) & (digits <= MAX_DIGITS)
+    if field.type is float:
+        values = mantissa / 10.0 ** decimals
+    else:
+        canonical &= ~dotted
+        values = mantissa
+    values = np.where(negative, -values, values).astype(field.dtype)
+    valid = canonical.copy()
+    for index in np.flatnonzero(~canonical):
+        try:
+            values[index] = field.type(column[index].decode('ascii'))
+            valid[index] = True
+        except (ValueError, OverflowError, UnicodeDecodeError):
+            pass
+    return values, valid
+
+
+def _clocks(column: np.ndarray) -> np.ndarray:
+    '''
+    Mask of valid times of day. hh:mm:ss[.s+] is checked on the raw bytes,
+    other spellings go through schema.clock.
+    '''
+    if column.dtype.itemsize < 8:
+        return _fallback(column, clock)
+    raw = _bytes(column)
+    width = raw.shape[1]
+    digits = raw.astype(np.int16) - ord('0')
+    whole = digits[:, [0, 1, 3, 4, 6, 7]]
+    canonical = ((raw[:, [2, 5]] == ord(':')).all(axis=1)
+                 & ((whole >= 0) & (whole <= 9)).all(axis=1)
+                 & (digits[:, 0] * 10 + digits[:, 1] < 24)
+                 & (digits[:, 3] * 10 + digits[:, 4] < 60)
+                 & (digits[:, 6] * 10 + digits[:, 7] < 60))
+    if width > 9:
+        # Nothing after the seconds, or a fraction padded with NUL bytes
+        tail = digits[:, 9:]
+        fraction = (raw[:, 8] == ord('.')) & (digits[:, 9] >= 0) & (digits[:, 9] <= 9) & \
+            ((tail >= 0) & (tail <= 9) | (raw[:, 9:] == 0)).all(axis=1)
+        canonical &= (raw[:, 8] == 0) | fraction
+    elif width == 9:
+        canonical &= raw[:, 8] == 0
+    valid = canonical.copy()
+    if not canonical.all():
+        valid[~canonical] = _fallback(column[~canonical], clock)
+    return valid
+
+
+def _text(column: np.ndarray, dtype: str) -> np.ndarray:
+    '''
+    Decode a bytes column like bytes.decode('ascii', 'replace').
+    '''
+    high = (_bytes(column) >= 0x80).any(axis=1)
+    if not high.any():
+        return column.astype(dtype)
+    text = np.empty(len(column), dtype=dtype)
+    text[~high] = column[~high].astype(dtype)
+    text[high] = [value.decode('ascii', 'replace') for value in column[high]]
+    return text
+
+
+def _numbers(column: np.ndarray, field):
+    '''
+    Converted values of a numeric column and the mask of valid ones.
+    '''
+    if field.optional:
+        column = np.where(column == b'', str(field.default).encode(), column)
+    values, valid = _decimals(column, field)
+    if field.type is float:
+        valid &= ~np.isnan(values)
+    if field.minimum is not None:
+        valid &= values >= field.minimum
+    if field.maximum is not None:
+        valid &= values <= field.maximum
+    return values, valid
+
+
+def _split(rows: list, schema):
+    '''
+    (rows, len(schema)) array of the fields of rows and the mask of rows
+    whose fields all fit into FIELD_WIDTH bytes.
+    '''
+    fields = b','.join(rows).split(b',')
+    width = max(map(len, fields))
+    fits = np.ones(len(rows), dtype=bool)
+    if width > FIELD_WIDTH:
+        lengths = np.fromiter(map(len, fields), dtype=np.int32, count=len(fields))
+        fits = (lengths.reshape(len(rows), len(schema)) <= FIELD_WIDTH).all(axis=1)
+        width = FIELD_WIDTH
+    fields = np.fromiter(fields, dtype=f'S{max(width, 1)}', count=len(fields))
+    return fields.reshape(len(rows), len(schema)), fits
+
+
+def _parseRows(rows: list, schema) -> np.ndarray:
+    '''
+    Structured array of the valid lines of rows, lines with as many fields
+    as the schema.
+    '''
+    fields, valid = _split(rows, schema)
+    valid &= fields[:, 3] == schema.packet_type.encode()
+    columns = []
+    for index, field in enumerate(schema.fields):
+        column = fields[:, index]
+        if field.type is TEXT or field.type is CLOCK:
+            if not field.optional:
+                valid &= column != b''
+            if field.type is CLOCK:
+                valid &= _clocks(column)
+            columns.append(column)
+        else:
+            values, ok = _numbers(column, field)
+            valid &= ok
+            columns.append(values)
+    records = np.empty(int(valid.sum()), dtype=schema.dtype)
+    for field, column in zip(schema.fields, columns):
+        column = column[valid]
+        if field.dtype.startswith('U'):
+            column = _text(column, field.dtype)
+        records[field.attribute] = column
+    return records
+
+
+def parse(data: bytes):
+    '''
+    Parse CSV frames separated by CR and/or LF. Returns ({packet type:
+    structured array}, number of rejected non-empty lines).
+    '''
+    lines = data.replace(b'\r', b'\n').split(b'\n')
+    total = len(lines) - lines.count(b'')
+    if max(map(len, lines), default=0) > MAX_LINE:
+        lines = [line for line in lines if len(line) <= MAX_LINE]
+    # Bucket the lines by their number of fields, C and T frames differ
+    commas = list(map(bytes.count, lines, repeat(b',')))
+    records = {}
+    for packet_type, schema in SCHEMAS.items():
+        rows = list(compress(lines, map((len(schema) - 1).__eq__, commas)))
+        if b'\0' in b''.join(rows):
+            # NUL pads NumPy bytes strings, a trailing one would go unnoticed
+            rows = [row for row in rows if b'\0' not in row]
+        records[packet_type] = _parseRows(rows, schema) if rows else np.empty(0, dtype=schema.dtype)
+    rejected = total - sum(len(array) for array in records.values())
+    return records, rejected
+
+
+def load(path: str):
+    '''
+    Parse a whole log file, see parse().
+    '''
+    with open(path, 'rb') as file:
+        return parse(file.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Load telemetry logs into NumPy structured arrays.')
+    parser.add_argument('logs', nargs='+')
+    args = parser.parse_args()
+    for path in args.logs:
+        start = time.perf_counter()
+        records, rejected = load(path)
+        elapsed = time.perf_counter() - start
+        counts = ', '.join(f'{len(array)} {packet_type}' for packet_type, array in records.items())
+        logger.info(f'{path}: {counts}, {rejected} rejected lines in {elapsed * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+import json
+import time
+
+
+class Histogram:
+    '''
+    HDR-style log-linear histogram of non-negative integers. Values below
+    2**sub_bucket_bits are counted exactly, larger ones in buckets with
+    sub_bucket_bits significant bits (at most 3% relative error by default).
+    Recording is O(1) and memory grows with log(max value) only.
+    '''
+
+    def __init__(self, sub_bucket_bits: int = 6):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.half_count = self.sub_bucket_count >> 1
+        self.counts = [0] * self.sub_bucket_count
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value: int) -> int:
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return shift * self.half_count + (value >> shift)
+
+    def _lowest(self, index: int) -> int:
+        if index < self.sub_bucket_count:
+            return index
+        shift = index // self.half_count - 1
+        return (index - shift * self.half_count) << shift
+
+    def record(self, value: int):
+        index = self._index(value)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percent: float) -> int:
+        if not self.count:
+            return 0
+        target = max(1, round(self.count * percent / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._lowest(index + 1) - 1, self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def buckets(self):
+        '''
+        (lowest value, count) of every non-empty bucket.
+        '''
+        return [(self._lowest(index), count) for index, count in enumerate(self.counts) if count]
+
+    def summary(self, unit: str = ''):
+        return (f'n={self.count} min={self.min}{unit} p50={self.percentile(50)}{unit} '
+                f'p99={self.percentile(99)}{unit} max={self.max}{unit}')
+
+
+class LinkMetrics:
+    '''
+    Counters of one serial link, cheap enough to update on every read.
+    Inter-arrival times are recorded in microseconds, RSSI (XBee API mode
+    only) in -dBm.
+
+    Read latency is the time a partial frame waits in the receive buffer for
+    the read that completes it, in microseconds. Besides the time on the
+    wire it contains the delays of the kernel and the USB adapter (up to
+    16 ms on FTDI adapters), which low latency mode removes.
+    '''
+
+    def __init__(self):
+        self.start_time = time.monotonic()
+        self.bytes_read = 0
+        self.frames = 0
+        self.decode_errors = 0
+        self.discarded_bytes = 0
+        self.inter_arrival = Histogram()
+        self.rssi = Histogram()
+        self.last_rssi = None
+        self.read_latency = Histogram()
+        self._last_arrival = None
+        self._partial_since = None
+
+    def frameArrived(self, now_ns: int):
+        self.frames += 1
+        if self._last_arrival is not None:
+            self.inter_arrival.record((now_ns - self._last_arrival) // 1000)
+        self._last_arrival = now_ns
+
+    def chunkRead(self, now_ns: int, frames: int, partial: bool):
+        '''
+        Called after every read with the number of frames it completed and
+        whether a partial frame is left in the buffer.
+        '''
+        if frames and self._partial_since is not None:
+            self.read_latency.record((now_ns - self._partial_since) // 1000)
+        if not partial:
+            self._partial_since = None
+        elif frames or self._partial_since is None:
+            self._partial_since = now_ns
+
+    def rssiMeasured(self, rssi: int):
+        self.rssi.record(rssi)
+        self.last_rssi = rssi
+
+    def rates(self):
+        elapsed = max(time.monotonic() - self.start_time, 1e-9)
+        return self.bytes_read / elapsed, self.frames / elapsed
+
+    def snapshot(self):
+        bytes_rate, frames_rate = self.rates()
+        return {
+            'bytes_read': self.bytes_read,
+            'frames': self.frames,
+            'decode_errors': self.decode_errors,
+            'discarded_bytes': self.discarded_bytes,
+            'bytes_per_second': bytes_rate,
+            'frames_per_second': frames_rate,
+            'inter_arrival_us': {
+                'count': self.inter_arrival.count,
+                'mean': self.inter_arrival.mean(),
+                'p50': self.inter_arrival.percentile(50),
+                'p90': self.inter_arrival.percentile(90),
+                'p99': self.inter_arrival.percentile(99),
+                'max': self.inter_arrival.max,
+                'buckets': self.inter_arrival.buckets(),
+            },
+            'read_latency_us': {
+                'count': self.read_latency.count,
+                'mean': self.read_latency.mean(),
+                'p50': self.read_latency.percentile(50),
+                'p99': self.read_latency.percentile(99),
+                'max': self.read_latency.max,
+            },
+            'rssi_dbm': {
+                'count': self.rssi.count,
+                'last': self.last_rssi,
+                'mean': self.rssi.mean(),
+                'p50': self.rssi.percentile(50),
+                'p99': self.rssi.percentile(99),
+                'max': self.rssi.max,
+            },
+        }
+
+    def summary(self):
+        bytes_rate, frames_rate = self.rates()
+        summary = (f'{bytes_rate:.0f} B/s, {frames_rate:.1f} frames/s, {self.decode_errors} decode errors, '
+                   f'{self.discarded_bytes} bytes discarded')
+        if self.read_latency.count:
+            summary += f', read latency p99 {self.read_latency.percentile(99) / 1000:.1f} ms'
+        if self.last_rssi is not None:
+            summary += f', RSSI -{self.last_rssi} dBm'
+        return summary
+
+
+def exportMetrics(path: str, metrics: dict):
+    with open(path, 'w') as file:
+        json.dump(metrics, file, indent=2)
@@ -1,48 +1,60 @@
-import glob
+import asyncio
+import os
 import serial
 import string
 import sys
+import time
 
+from collections import deque
 from serial.serialutil import SerialException
+from lib.binary import BinaryFramer
+from lib.discovery import discovery
+from lib.journal import Journal, ReplayDevice
 from lib.logger import logger
+from lib.metrics import LinkMetrics
+from lib.xbee import XBeeFramer, transmitRequest
+
+_PRINTABLE_BYTES = string.printable.encode('ascii')
+_DISCARDED_BYTES = bytes(b for b in range(256)
+                         if b not in _PRINTABLE_BYTES) + b'\r\n'
 
 
 class Port:
-    def __init__(self, port_name: str, terminate_char: str, begin_char: str = None, baudrate=9600,  key=None):
+    timeout = 60
+    latency_timer = 1  # ms, FTDI adapters default to 16
+
+    def __init__(self, port_name: str, terminate_char: str, begin_char: str = None, baudrate=9600,  key=None, chunk_size=4096, wire_format='ascii', journal_path=None, low_latency=False, timeout=None):
         self.port_name = port_name
+        if timeout is not None:
+            self.timeout = timeout  # seconds a read waits for the first byte
         self.baudrate = baudrate
         self.terminate_char = terminate_char
         self.key = key
         self.begin_char = begin_char
+        self.terminate_bytes = terminate_char.encode('utf-8')
+        self.begin_bytes = begin_char.encode(
+            'utf-8') if begin_char is not None else None
+        self.chunk_size = chunk_size
         self.device = None
         self.connected = False
+        self.opened = False  # the device was open once, only a link that was up is reconnected
+        self._buffer = bytearray()
+        self._pending = deque()
+        self.last_frame_time = None
+        self.binary = BinaryFramer() if wire_format == 'binary' else None
+        self.xbee = XBeeFramer() if wire_format == 'xbee' else None
+        self._sources = {}  # XBee source address -> partial frame
+        self._rssi = deque()  # RSSI of every pending frame, XBee API mode only
+        self.rssi = None  # RSSI (-dBm) of the last frame handed out
+        self.metrics = LinkMetrics()
+        self.journal_path = journal_path
+        self.journal = None
+        self.low_latency = low_latency
         logger.debug('port init called')
 
     @staticmethod
-    def list():
-        if sys.platform.startswith('win'):
-            ports = ['COM%s' % (i + 1) for i in range(256)]
-        elif sys.platform.startswith('linux') or sys.platform.startswith('cygwin'):
-            # this excludes your current terminal "/dev/tty"
-            ports = glob.glob('/dev/tty[A-Za-z]*')
-        elif sys.platform.startswith('darwin'):
-            ports = glob.glob('/dev/tty.*')
-        else:
-            raise EnvironmentError('Unsupported platform')
-
-        result = []
-        for port in ports:
-            try:
-                s = serial.Serial(port)
-                s.close()
-                if port == '/dev/tty.Bluetooth-Incoming-Port':
-                    continue
-                result.append(port)
-            except serial.SerialException:
-                pass    # legit 'except pass' here
-            except Exception as e:
-                logger.error(
-                    f'An error occured during port check ({port}): {e}')
+    def list(refresh: bool = False):
+        result = discovery.list(refresh=refresh)
         if(result.__len__() == 0):
             logger.warning('No ports available')
         else:
@@ -50,8 +62,11 @@ class Port:
         return result
 
     def write(self, text: str):
+        data = text.encode('utf-8')
+        if self.xbee is not None:
+            data = transmitRequest(data)
         try:
-            self.device.write(text.encode('utf-8'))
+            self.device.write(data)
         except Exception as e:
             logger.error(f"Cannot write to {self.device}: {e}")
 
@@ -62,46 +77,183 @@ class Port:
             return
         self.connected = True
         logger.debug('port connect called')
+        if self.journal_path is not None and self.journal is None:
+            self.journal = Journal(self.journal_path)
         try:
             self.device = serial.Serial(
-                self.port_name, baudrate=self.baudrate, timeout=60)
-            logger.info(f'Connected to port {self.device}')
+                self.port_name, baudrate=self.baudrate, timeout=self.timeout)
         except Exception as e:
             logger.error(f"Cannot connect to port {self.device}: {e}")
+            return
+        if not self.device.is_open:
+            # serial.Serial(None) returns without opening anything
+            logger.error(f'Cannot connect to port {self.port_name}: no port selected')
+            return
+        logger.info(f'Connected to port {self.device}')
+        self.opened = True
+        discovery.hold(self.port_name)
+        if self.low_latency:
+            self._setLowLatency()
+
+    def _setLowLatency(self):
+        '''
+        Make the kernel and the USB adapter hand over bytes as soon as they
+        arrive (Linux only). pyserial already leaves VMIN and VTIME at 0 and
+        waits in select(), and _readChunk takes whatever is waiting, so no
+        read blocks for more bytes than are there.
+        '''
+        if not sys.platform.startswith('linux'):
+            logger.warning(f'Low latency mode is only supported on Linux, {self.port_name} left as is')
+            return
+        try:
+            # ASYNC_LOW_LATENCY, skips the tty flip buffer delay
+            self.device.set_low_latency_mode(True)
+        except (AttributeError, ValueError) as e:
+            logger.warning(f'Cannot set ASYNC_LOW_LATENCY on {self.port_name}: {e}')
+        # FTDI adapters hold bytes for up to latency_timer ms before sending them over USB
+        device = os.path.basename(os.path.realpath(self.port_name))
+        path = f'/sys/bus/usb-serial/devices/{device}/latency_timer'
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'w') as file:
+                file.write(str(self.latency_timer))
+            logger.info(f'Latency timer of {self.port_name} set to {self.latency_timer} ms')
+        except OSError as e:
+            logger.warning(f'Cannot set the latency timer of {self.port_name} ({path} needs write access): {e}')
+
+    def reconnect(self):
+        '''
+        Close and reopen the same device, dropping any partial frame.
+        Returns True once the device is open again.
+        '''
+        if self.device is not None:
+            self.destroy()
+        self.device = None
+        self.connected = False
+        self._buffer.clear()
+        self._pending.clear()
+        if self.binary is not None:
+            self.binary.buffer.clear()
+        if self.xbee is not None:
+            self.xbee.buffer.clear()
+        self._sources.clear()
+        self._rssi.clear()
+        self.connect()
+        return self.device is not None and self.device.is_open
+
+    def _readChunk(self):
+        '''
+        Pull everything waiting on the device in one call and move every
+        complete frame into the pending queue. Partial frames stay buffered.
+        '''
+        device = self.device
+        if device is None or not device.is_open:
+            raise DisconnectException
+        try:
+            chunk = device.read(
+                min(max(device.in_waiting, 1), self.chunk_size))
+        except (SerialException, OSError) as e:
+            logger.error(f'Error reading from serial: {e}')
+            raise DisconnectException
+        except (AttributeError, TypeError):
+            # Closed by another thread while reading, pyserial drops its file descriptor
+            raise DisconnectException
+        if not chunk:
+            return
+        if self.journal is not None:
+            self.journal.write(chunk)
+        metrics = self.metrics
+        metrics.bytes_read += len(chunk)
+        now = time.perf_counter_ns()
+        pending = len(self._pending)
+        if self.binary is not None:
+            records = self.binary.feed(chunk)
+            if records:
+                # Struct values, FrameValidator makes records of them directly
+                self._pending.extend(records)
+                self.last_frame_time = time.monotonic()
+                for _ in records:
+                    metrics.frameArrived(now)
+            metrics.decode_errors = self.binary.checksum_errors
+            metrics.discarded_bytes = self.binary.discarded_bytes
+            partial = self.binary.buffer
+        elif self.xbee is not None:
+            errors, discarded = self.xbee.checksum_errors, self.xbee.discarded_bytes
+            self._readPackets(self.xbee.feed(chunk), now)
+            metrics.decode_errors += self.xbee.checksum_errors - errors
+            metrics.discarded_bytes += self.xbee.discarded_bytes - discarded
+            partial = self.xbee.buffer or any(tail.lstrip(b'\n') for tail in self._sources.values())
+        else:
+            self._buffer += chunk
+            *frames, tail = self._buffer.split(self.terminate_bytes)
+            self._buffer = bytearray(tail)
+            for frame in frames:
+                frame = self._clean(frame)
+                if frame:
+                    self._pending.append(frame)
+                    metrics.frameArrived(now)
+            if frames:
+                self.last_frame_time = time.monotonic()
+            # The LF of a CRLF line ending is not the start of a frame
+            partial = self._buffer.lstrip(b'\n')
+        metrics.chunkRead(now, len(self._pending) - pending, bool(partial))
+
+    def _readPackets(self, packets: list, now: int):
+        '''
+        Frame the data of XBee RX packets. A frame may span several RF
+        packets, so data is reassembled per source address.
+        '''
+        metrics = self.metrics
+        for packet in packets:
+            if packet.rssi is not None:
+                metrics.rssiMeasured(packet.rssi)
+            buffer = self._sources.setdefault(packet.source, bytearray())
+            buffer += packet.data
+            *frames, tail = buffer.split(self.terminate_bytes)
+            self._sources[packet.source] = bytearray(tail)
+            for frame in frames:
+                frame = self._clean(frame)
+                if frame:
+                    self._pending.append(frame)
+                    self._rssi.append(packet.rssi)
+                    metrics.frameArrived(now)
+            if frames:
+                self.last_frame_time = time.monotonic()
+
+    def _popFrame(self):
+        if self._rssi:
+            self.rssi = self._rssi.popleft()
+        return self._pending.popleft()
+
+    def _clean(self, frame: bytes):
+        if self.begin_bytes is not None:
+            begin = frame.rfind(self.begin_bytes)
+            if begin > 0:
+                frame = frame[begin:]
+        # Keep the old behaviour of dropping non-printable characters, \r and \n
+        text = frame.translate(None, _DISCARDED_BYTES).decode('ascii')
+        newlines = frame.count(b'\n')
+        if len(text) + newlines != len(frame):
+            # Bytes that used to raise UnicodeDecodeError or were not printable
+            if not frame.isascii():
+                self.metrics.decode_errors += 1
+            self.metrics.discarded_bytes += len(frame) - len(text) - newlines
+        return text
+
+    def frames(self):
+        '''
+        Iterate over every complete frame available after a single read.
+        Use this to drain a burst of frames per wakeup.
+        '''
+        self._readChunk()
+        while self._pending:
+            yield self._popFrame()
 
     def read(self):
-        combined = ''
-        current_char = None
-        while current_char != self.terminate_char:
-            if self.device is None:
-                raise DisconnectException
-            try:
-                # logger.debug('Trying to read from port')
-                current_char = self.device.read().decode('utf-8')
-                if current_char is None:
-                    logger.debug(
-                        'Received None while trying to read from port')
-                    return
-            except SerialException as e:
-                logger.error(
-                    f'Error reading/decoding character from serial: {e}')
-                raise DisconnectException
-            except UnicodeDecodeError as e:
-                logger.warn(
-                    f'Error reading/decoding character from serial: {e}')
-                return
-            # logger.debug('Append while loop: ' +
-            #              current_char)
-            if self.begin_char is not None and current_char == self.begin_char:
-                combined = ''
-            if current_char in string.printable:
-                combined += current_char
-            # try:
-            #     current_char = self.device.read().decode('utf-8')
-            # except:
-            #     pass
-        combined = combined.replace('\r', '').replace('\n', '')
-        return combined
+        while not self._pending:
+            self._readChunk()
+        return self._popFrame()
 
     def reading(self):
         if self.device is None:
@@ -122,12 +274,85 @@ class Port:
         return recieved
 
     def destroy(self):
+        discovery.release(self.port_name)
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
         try:
             self.device.close()
         except Exception as e:
             logger.error(f'Unable to close serial port {self.port_name}: {e}')
 
 
+class AsyncPort(Port):
+    '''
+    Non-blocking counterpart of Port for asyncio event loops. The serial file
+    descriptor is watched with loop.add_reader (epoll/kqueue), so no thread
+    has to block on it and consumers can be cancelled cleanly.
+    Only available on POSIX, Windows COM handles cannot be selected on.
+    '''
+    timeout = 0
+
+    def __init__(self, *args, timeout=None, **kwargs):
+        # Never blocks, the event loop waits instead
+        super().__init__(*args, **kwargs)
+        self._loop = None
+        self._fd = None
+        self._readable = None
+
+    async def frames(self):
+        '''
+        Asynchronously iterate over incoming frames until cancelled or the
+        device disconnects (DisconnectException).
+        '''
+        if self.device is None or not self.device.is_open:
+            raise DisconnectException
+        self._loop = asyncio.get_running_loop()
+        self._readable = asyncio.Event()
+        self._fd = self.device.fileno()
+        self._loop.add_reader(self._fd, self._readable.set)
+        try:
+            while True:
+                while self._pending:
+                    yield self._popFrame()
+                await self._readable.wait()
+                self._readable.clear()
+                self._readChunk()
+        finally:
+            self._removeReader()
+
+    def _removeReader(self):
+        if self._loop is not None:
+            self._loop.remove_reader(self._fd)
+        self._loop = None
+        self._fd = None
+
+    def destroy(self):
+        try:
+            self._removeReader()
+        except Exception as e:
+            logger.error(f'Unable to unwatch serial port {self.port_name}: {e}')
+        super().destroy()
+
+
+class ReplayPort(Port):
+    '''
+    Port reading a raw byte journal instead of a radio, port_name is the
+    journal path. Frames come out exactly as they did during the capture.
+    '''
+
+    def __init__(self, *args, speed: float = 1.0, origin: int = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.speed = speed
+        self.origin = origin
+
+    def connect(self):
+        self.connected = True
+        self.device = ReplayDevice(self.port_name, self.speed, self.origin)
+        self.opened = True
+        logger.info(f'Replaying {self.port_name} at {self.speed}x')
+
+
 class DisconnectException(Exception):
     pass
 
@@ -0,0 +1,166 @@
+'''
+Min/max decimation pyramid of the columns of a telemetry stream.
+
+Level L splits the session into buckets of FACTOR**L packets and keeps the
+minimum and maximum of every column in each of them, and which of the two
+came first. A bucket is drawn as two points, so any range of packets can be
+plotted from a bounded number of points without losing spikes. Every level
+is built incrementally from complete buckets of the level below and keeps
+its newest `capacity` to 2 * `capacity` buckets only, coarse levels cover
+the older part of the session.
+'''
+
+import numpy as np
+
+FACTOR = 8  # buckets of a level grouped into one bucket of the next
+
+
+class _Level:
+    __slots__ = ('lo', 'hi', 'order', 'count', 'held', 'carry')
+
+    def __init__(self, columns: int, size: int):
+        self.lo = np.empty((columns, size))
+        self.hi = np.empty((columns, size))
+        self.order = np.empty((columns, size), dtype=bool)  # minimum before maximum
+        self.count = 0  # buckets built since the session began
+        self.held = 0  # newest buckets in memory
+        self.carry = None  # buckets not grouped into the next level yet
+
+    @property
+    def start(self) -> int:
+        return self.count - self.held
+
+
+class MinMaxPyramid:
+
+    def __init__(self, columns: int, capacity: int = 512):
+        self.columns = columns
+        self.capacity = capacity
+        self.levels = []  # level 1 first
+
+    @property
+    def consumed(self) -> int:
+        '''
+        Packets in the complete buckets of level 1, extend() continues from there.
+        '''
+        return self.levels[0].count * FACTOR if self.levels else 0
+
+    def extend(self, samples: np.ndarray):
+        '''
+        Add the packets after consumed, (columns, n) with n a multiple of FACTOR.
+        '''
+        grouped = samples.reshape(self.columns, -1, FACTOR)
+        self._extend(0, grouped.min(2), grouped.max(2), grouped.argmin(2) <= grouped.argmax(2))
+
+    def _extend(self, depth: int, lo: np.ndarray, hi: np.ndarray, order: np.ndarray):
+        if depth == len(self.levels):
+            self.levels.append(_Level(self.columns, 2 * self.capacity))
+        level = self.levels[depth]
+        self._store(level, lo, hi, order)
+        if level.carry is not None:
+            carry_lo, carry_hi, carry_order = level.carry
+            lo = np.concatenate((carry_lo, lo), axis=1)
+            hi = np.concatenate((carry_hi, hi), axis=1)
+            order = np.concatenate((carry_order, order), axis=1)
+        complete = lo.shape[1] // FACTOR * FACTOR
+        level.carry = (lo[:, complete:], hi[:, complete:], order[:, complete:]) if lo.shape[1] > complete else None
+        if not complete:
+            return
+        lo = lo[:, :complete].reshape(self.columns, -1, FACTOR)
+        hi = hi[:, :complete].reshape(self.columns, -1, FACTOR)
+        order = order[:, :complete].reshape(self.columns, -1, FACTOR)
+        first = lo.argmin(2)[..., None]
+        last = hi.argmax(2)[..., None]
+        # The extremes of a group come from one bucket each, or both from the same one
+        self._extend(depth + 1,
+                     np.take_along_axis(lo, first, 2)[..., 0],
+                     np.take_along_axis(hi, last, 2)[..., 0],
+                     ((first < last) | ((first == last) & np.take_along_axis(order, first, 2)))[..., 0])
+
+    def _store(self, level: _Level, lo: np.ndarray, hi: np.ndarray, order: np.ndarray):
+        count = lo.shape[1]
+        size = level.lo.shape[1]
+        level.count += count
+        if count > size:
+            lo, hi, order = lo[:, -size:], hi[:, -size:], order[:, -size:]
+            count = size
+        if level.held + count > size:
+            # Keep the newer half at most
+            keep = min(level.held, size // 2, size - count)
+            for array in (level.lo, level.hi, level.order):
+                array[:, :keep] = array[:, level.held - keep:level.held]
+            level.held = keep
+        end = level.held + count
+        level.lo[:, level.held:end] = lo
+        level.hi[:, level.held:end] = hi
+        level.order[:, level.held:end] = order
+        level.held = end
+
+    def cover(self, first: int, last: int, points: int, raw_start: int = 0) -> list:
+        '''
+        Segments (level, first, last) drawing packets first to last in at
+        most about `points` points, coarsest buckets in the middle and finer
+        ones at the edges. Level 0 segments are packets, raw_start is the
+        oldest one still available, the others are buckets of that level.
+        The packets of the last bucket, complete or not, are always drawn as
+        they are, so the series ends with the newest packet.
+        '''
+        segments = []
+        depth = 0
+        size = 1
+        while depth < len(self.levels):
+            # Packets are drawn as one point each, buckets as two
+            fits = last - first <= points if depth == 0 else size * points >= 2 * (last - first)
+            held = first >= raw_start if depth == 0 else -(-first // size) >= self.levels[depth - 1].start
+            if fits and held:
+                break
+            depth += 1
+            size *= FACTOR
+        if depth == 0:
+            self._cover(0, first, last, raw_start, segments)
+            return segments
+        tail = max(first, raw_start, (last - 1) // FACTOR * FACTOR)
+        self._cover(depth, first, tail, raw_start, segments)
+        self._cover(0, tail, last, raw_start, segments)
+        return segments
+
+    def _cover(self, depth: int, first: int, last: int, raw_start: int, segments: list):
+        if first >= last:
+            return
+        if depth == 0:
+            first = max(first, raw_start)
+            if first < last:
+                segments.append((0, first, last))
+            return
+        level = self.levels[depth - 1]
+        size = FACTOR ** depth
+        begin = max(-(-first // size), level.start)
+        end = min(last // size, level.count)
+        if begin >= end:
+            self._cover(depth - 1, first, last, raw_start, segments)
+            return
+        self._cover(depth - 1, first, begin * size, raw_start, segments)
+        segments.append((depth, begin, end))
+        self._cover(depth - 1, end * size, last, raw_start, segments)
+
+    def points(self, depth: int, first: int, last: int, x: int, y: tuple) -> tuple:
+        '''
+        Two points per bucket of level depth, x spanning the bucket and y
+        the extremes of each column in y in the order they came.
+        '''
+        level = self.levels[depth - 1]
+        begin = first - level.start
+        end = last - level.start
+        xs = np.empty(2 * (end - begin))
+        xs[0::2] = level.lo[x, begin:end]
+        xs[1::2] = level.hi[x, begin:end]
+        ys = []
+        for row in y:
+            lo = level.lo[row, begin:end]
+            hi = level.hi[row, begin:end]
+            order = level.order[row, begin:end]
+            values = np.empty(2 * (end - begin))
+            values[0::2] = np.where(order, lo, hi)
+            values[1::2] = np.where(order, hi, lo)
+            ys.append(values)
+        return xs, ys
@@ -0,0 +1,95 @@
+'''
+Worker side of the telemetry pipeline: everything a frame needs except
+the widgets. CSV logs, the KML track, MQTT, the packet counters and the
+packet loss of each stream are updated on the thread that reads the
+radio, so the GUI thread only has to display the frames it is handed.
+'''
+
+import threading
+
+from lib.gaps import GapTracker
+from lib.gearth import Coordinate, LoadDirectory
+from lib.logger import logger
+from lib.schema import CONTAINER, PAYLOAD, SCHEMAS, CsvLog
+from settings import TEAM_ID
+
+# Altitude of each stream, loss is binned by it
+ALTITUDES = {'C': 'altitude', 'T': 'tp_altitude'}
+
+
+class TelemetryRecorder:
+    '''
+    Logs and counts every frame of a session. mqtt is a connected paho
+    client or None, it can be swapped while frames are being recorded.
+    '''
+
+    def __init__(self, time_begin: str, mqtt=None):
+        self.mqtt = mqtt
+        self.counts = {packet_type: {'healthy': 0, 'corrupted': 0} for packet_type in SCHEMAS}
+        self.gaps = {packet_type: GapTracker() for packet_type in SCHEMAS}
+        # Healthy packets and every packet of each type, for this run and for the session
+        self.healthy_logs = {
+            'C': [CsvLog('Flight_1022_C.csv', CONTAINER, 'w'),
+                  CsvLog(f'logs/{time_begin}_Flight_1022_C.csv', CONTAINER)],
+            'T': [CsvLog('Flight_1022_T.csv', PAYLOAD, 'w'),
+                  CsvLog(f'logs/{time_begin}_Flight_1022_T.csv', PAYLOAD)],
+        }
+        self.all_logs = {
+            'C': [CsvLog('Flight_1022_C_with_corrupted.csv', CONTAINER, 'w'),
+                  CsvLog(f'logs/{time_begin}_Flight_1022_C_with_corrupted.csv', CONTAINER)],
+            'T': [CsvLog('Flight_1022_T_with_corrupted.csv', PAYLOAD, 'w'),
+                  CsvLog(f'logs/{time_begin}_Flight_1022_T_with_corrupted.csv', PAYLOAD)],
+        }
+        self.raw_log = open('rawfilterwithouttp.csv', 'a', buffering=1)
+        self.dirloader = LoadDirectory(
+            'neilkml', 'neilcsv', 'csv', earth_save_name=time_begin, folder_name='kml')
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def record(self, frame) -> bool:
+        '''
+        Log frame and count it. Returns False for frames of unknown origin,
+        which are not worth displaying.
+        '''
+        with self._lock:
+            if self.closed:
+                return False
+            self.raw_log.write(frame.data + '\n')
+            mqtt = self.mqtt
+            if mqtt is not None:
+                # The line as received and logged, empty fields and precision kept
+                mqtt.publish(f'teams/{TEAM_ID}', frame.data)
+            if frame.packet_type not in self.all_logs:
+                logger.warning(f'Packet of unknown origin ({frame.status}): {frame.data}')
+                return False
+            for log in self.all_logs[frame.packet_type]:
+                log.append(frame.data)
+            counts = self.counts[frame.packet_type]
+            if frame.record is None:
+                counts['corrupted'] += 1
+                logger.warning(f'Corrupted packet ({frame.status}): {frame.data}')
+                return True
+            counts['healthy'] += 1
+            record = frame.record
+            self.gaps[frame.packet_type].packet(
+                record.packet_count, getattr(record, ALTITUDES[frame.packet_type]))
+            for log in self.healthy_logs[frame.packet_type]:
+                log.append(frame.data)
+            if frame.packet_type == 'C':
+                self.dirloader.appendEarthCoord(Coordinate(
+                    record.gps_latitude, record.gps_longitude, record.altitude), color='ff00ff00')
+            return True
+
+    def total(self) -> int:
+        return sum(counts['healthy'] + counts['corrupted'] for counts in self.counts.values())
+
+    def corrupted(self) -> int:
+        return sum(counts['corrupted'] for counts in self.counts.values())
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            self.raw_log.close()
+            for logs in (*self.healthy_logs.values(), *self.all_logs.values()):
+                for log in logs:
+                    log.close()
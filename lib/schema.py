@@ -0,0 +1,229 @@
+'''
+Declarative layouts of the container (C) and payload (T) telemetry packets.
+
+Every field has a name, a type, a unit, a valid range and, if it may be
+left empty, a default. Validation, decoding, CSV headers and logs, charts
+and MQTT payloads are all driven from CONTAINER and PAYLOAD.
+
+For each schema a decoder is compiled that checks and converts all fields
+of a frame in one pass and returns a record: an instance of a __slots__
+class with one lowercase attribute per field (record.altitude). Values
+that are already of their field type (binary frames) are only checked
+against the field ranges by the compiled build().
+'''
+
+import numpy as np
+
+TEXT = 'text'
+CLOCK = 'clock'
+
+CONTAINER_STATES = ('PRELAUNCH', 'LAUNCH', 'APOGEE',
+                    'PARADEPLOY', 'TPDEPLOY', 'LAND')
+
+
+def clock(value: str) -> str:
+    '''
+    Check a hh:mm:ss[.ss] time of day, the text is kept as is.
+    '''
+    hours, minutes, seconds = value.split(':')
+    seconds = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    if not 0 <= seconds < 86400:
+        raise ValueError(f'{value} is not a time of day')
+    return value
+
+
+class Field:
+    __slots__ = ('name', 'attribute', 'type', 'unit',
+                 'minimum', 'maximum', 'default')
+
+    def __init__(self, name: str, type=TEXT, unit: str = '', minimum=None, maximum=None, default=None):
+        self.name = name
+        self.attribute = name.lower()
+        self.type = type
+        self.unit = unit
+        self.minimum = minimum
+        self.maximum = maximum
+        self.default = default  # value of an empty field, None if it must not be empty
+
+    @property
+    def optional(self):
+        return self.default is not None
+
+    @property
+    def dtype(self):
+        if self.type is int:
+            return 'i8'
+        if self.type is float:
+            return 'f8'
+        return 'U16'
+
+
+class Schema:
+    def __init__(self, packet_type: str, fields: tuple):
+        self.packet_type = packet_type
+        self.fields = fields
+        self.names = tuple(field.name for field in fields)
+        self.header = ','.join(self.names)
+        self.dtype = np.dtype([(field.attribute, field.dtype) for field in fields])
+        self.record_class = type(f'Record{packet_type}', (Record,), {
+            '__slots__': tuple(field.attribute for field in fields),
+            'schema': self,
+        })
+        self.decode = self._compile()
+        self.build = self._compile(parse=False)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def field(self, name: str) -> Field:
+        return self.fields[self.names.index(name)]
+
+    def unit(self, name: str) -> str:
+        return self.field(name).unit
+
+    def _compile(self, parse: bool = True):
+        '''
+        Generate decode(fields) for this layout. It returns a record or
+        raises ValueError naming the first bad field. Without parse, the
+        fields are taken as they are and only their ranges are checked.
+        '''
+        namespace = {'Record': self.record_class, 'clock': clock}
+        lines = ['def decode(fields):',
+                 f'    if len(fields) != {len(self.fields)}:',
+                 f"        raise ValueError('expected {len(self.fields)} fields, got ' + str(len(fields)))",
+                 '    record = Record.__new__(Record)']
+        for index, field in enumerate(self.fields):
+            value = f'fields[{index}]'
+            if not parse:
+                lines.append(f'    value = {value}')
+                lines += self._checks(field, '    ')
+                lines.append(f'    record.{field.attribute} = value')
+                continue
+            if field.type is TEXT:
+                convert = value
+            elif field.type is CLOCK:
+                convert = f'clock({value})'
+            else:
+                convert = f'{field.type.__name__}({value})'
+            lines += [f'    value = {value}',
+                      '    if not value:']
+            if field.optional:
+                namespace[f'default_{index}'] = field.default
+                lines += [f'        record.{field.attribute} = default_{index}',
+                          '    else:']
+            else:
+                lines += [f"        raise ValueError('{field.name} is empty')",
+                          '    else:']
+            lines += ['        try:',
+                      f'            value = {convert}',
+                      '        except ValueError:',
+                      f"            raise ValueError('{field.name} is not a {getattr(field.type, '__name__', field.type)}')"]
+            lines += self._checks(field, '        ')
+            lines.append(f'        record.{field.attribute} = value')
+        lines.append('    return record')
+        exec('\n'.join(lines), namespace)
+        return namespace['decode']
+
+    @staticmethod
+    def _checks(field: Field, indent: str) -> list:
+        checks = []
+        if field.type is float:
+            checks.append('value != value')
+        if field.minimum is not None:
+            checks.append(f'value < {field.minimum!r}')
+        if field.maximum is not None:
+            checks.append(f'value > {field.maximum!r}')
+        if not checks:
+            return []
+        return [f"{indent}if {' or '.join(checks)}:",
+                f"{indent}    raise ValueError('{field.name} is out of range')"]
+
+    def format(self, record) -> str:
+        '''
+        CSV line of a record, in the layout of this schema.
+        '''
+        return ','.join(map(str, record.values()))
+
+
+class Record:
+    '''
+    Base of the generated record classes, schema is set on each subclass.
+    '''
+    __slots__ = ()
+
+    def values(self) -> tuple:
+        return tuple(getattr(self, field.attribute) for field in self.schema.fields)
+
+    def asdict(self) -> dict:
+        return {field.name: getattr(self, field.attribute) for field in self.schema.fields}
+
+    def row(self) -> np.ndarray:
+        '''
+        NumPy structured row with the dtype of the schema.
+        '''
+        return np.array(self.values(), dtype=self.schema.dtype)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.schema.format(self)})'
+
+
+CONTAINER = Schema('C', (
+    Field('TEAM_ID', int, '', 0, 9999),
+    Field('MISSION_TIME', CLOCK),
+    Field('PACKET_COUNT', int, '', 0),
+    Field('PACKET_TYPE'),
+    Field('MODE'),
+    Field('TP_RELEASED'),
+    Field('ALTITUDE', float, 'm', -1000, 30000),
+    Field('TEMP', float, '°C', -60, 125),
+    Field('VOLTAGE', float, 'V', 0, 15),
+    Field('GPS_TIME', CLOCK),
+    Field('GPS_LATITUDE', float, '°', -90, 90),
+    Field('GPS_LONGITUDE', float, '°', -180, 180),
+    Field('GPS_ALTITUDE', float, 'm', -1000, 30000),
+    Field('GPS_SATS', int, '', 0, 99),
+    Field('SOFTWARE_STATE'),
+    Field('CMD_ECHO', default=''),
+))
+PAYLOAD = Schema('T', (
+    Field('TEAM_ID', int, '', 0, 9999),
+    Field('MISSION_TIME', CLOCK),
+    Field('PACKET_COUNT', int, '', 0),
+    Field('PACKET_TYPE'),
+    # The payload leaves these empty when its sensor fails
+    Field('TP_ALTITUDE', float, 'm', -1000, 30000, default=-1.0),
+    Field('TP_TEMP', float, '°C', -60, 125, default=-1.0),
+    Field('TP_VOLTAGE', float, 'V', 0, 15),
+    Field('GYRO_R', float, 'degrees/s', -4000, 4000),
+    Field('GYRO_P', float, 'degrees/s', -4000, 4000),
+    Field('GYRO_Y', float, 'degrees/s', -4000, 4000),
+    Field('ACCEL_R', float, 'm/s²', -200, 200),
+    Field('ACCEL_P', float, 'm/s²', -200, 200),
+    Field('ACCEL_Y', float, 'm/s²', -200, 200),
+    Field('MAG_R', float, 'gauss', -100, 100),
+    Field('MAG_P', float, 'gauss', -100, 100),
+    Field('MAG_Y', float, 'gauss', -100, 100),
+    Field('POINTING_ERROR', float, 'degrees', -360, 360),
+    Field('TP_SOFTWARE_STATE'),
+))
+SCHEMAS = {'C': CONTAINER, 'T': PAYLOAD}
+
+
+class CsvLog:
+    '''
+    Append-only CSV file of one packet type. The header is written when the
+    file is created (or truncated with mode 'w'), the file stays open and is
+    flushed after every line.
+    '''
+
+    def __init__(self, path: str, schema: Schema, mode: str = 'a'):
+        self.path = path
+        self.file = open(path, mode, buffering=1)
+        if self.file.tell() == 0:
+            self.file.write(schema.header + '\n')
+
+    def append(self, line: str):
+        self.file.write(line + '\n')
+
+    def close(self):
+        self.file.close()
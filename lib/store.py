@@ -0,0 +1,201 @@
+'''
+Columnar in-memory store of the telemetry received in a session.
+
+The numeric fields of a stream live in one preallocated float64 block,
+one row per field, that doubles its capacity when full. A column is a
+contiguous view that can be plotted without copying. Appending a record
+only stages its values, staged records are converted into the block with
+one NumPy call when a column is read next, i.e. once per displayed batch.
+Integer fields are exact up to 2**53.
+
+With a retention, only the newest `retention` to 2 * `retention` packets
+stay in memory. Whenever the block is full the older half is appended to
+the spill file (float64 rows of store.names, no header) or dropped if
+there is none, and the newer half moves to the front. Memory stays flat
+however long the session runs and appending stays O(1) amortized.
+
+Every column is also decimated into a MinMaxPyramid as it is flushed, so
+decimate() draws any range of the session, spilled packets included, in a
+bounded number of points.
+
+    store = TelemetryStore(PAYLOAD, retention=14400, spill_path='logs/T.f64')
+    store.append(record)
+    chart.plot(store['packet_count'], store['tp_temp'])
+    x, temp = store.decimate('packet_count', 'tp_temp', points=1000)
+    altitude = store.history('tp_altitude')
+'''
+
+from operator import attrgetter
+
+import numpy as np
+
+from lib.pyramid import FACTOR, MinMaxPyramid
+
+# Position of the packet in the session, 1-based
+INDEX = 'index'
+STAGED = 256  # records converted at once at most
+SMALL = 4  # fewer staged records are written one by one, cheaper than np.array
+POINTS = 1000  # drawn by decimate() by default
+
+
+class TelemetryStore:
+
+    def __init__(self, schema, capacity: int = 4096, retention: int = None, spill_path: str = None):
+        self.schema = schema
+        self.names = (INDEX,) + tuple(field.attribute for field in schema.fields
+                                      if field.type is int or field.type is float)
+        self._rows = {name: row for row, name in enumerate(self.names)}
+        self._values = attrgetter(*self.names[1:])
+        if retention is not None:
+            # Room for a full staging and the packets of an unfinished bucket
+            retention = max(retention, 2 * STAGED)
+            capacity = 2 * retention
+        self.retention = retention
+        self.spill_path = spill_path
+        self._spill = None
+        self._capacity = capacity
+        self.clear()
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        '''
+        View of a column, the packets in memory only. Valid until the store
+        grows, spills or is cleared.
+        '''
+        if self._staged:
+            self._flush()
+        return self._block[self._rows[name], :self.length - self.spilled]
+
+    def append(self, record):
+        self._staged.append(self._values(record))
+        self.length += 1
+        if len(self._staged) >= STAGED:
+            self._flush()
+
+    def _flush(self):
+        staged = self._staged
+        start = self.length - self.spilled - len(staged)
+        end = start + len(staged)
+        capacity = self._block.shape[1]
+        if end > capacity:
+            if self.retention is None:
+                while end > capacity:
+                    capacity *= 2
+                block = np.empty((len(self.names), capacity))
+                block[:, :start] = self._block[:, :start]
+                self._block = block
+            else:
+                dropped = end - self.retention
+                self._spillRows(dropped)
+                start -= dropped
+                end -= dropped
+        block = self._block
+        first = self.spilled + start + 1
+        if len(staged) <= SMALL:
+            for position, values in enumerate(staged, start):
+                block[:, position] = (first + position - start, *values)
+        else:
+            block[0, start:end] = np.arange(first, first + len(staged))
+            block[1:, start:end] = np.array(staged, dtype=float).T
+        staged.clear()
+        consumed = self.pyramid.consumed
+        complete = (self.length - consumed) // FACTOR * FACTOR
+        if complete:
+            begin = consumed - self.spilled
+            self.pyramid.extend(block[:, begin:begin + complete])
+
+    def _spillRows(self, count: int):
+        '''
+        Move the oldest count packets in memory out to the spill file.
+        '''
+        block = self._block
+        held = self.length - self.spilled - len(self._staged)
+        if self.spill_path is not None:
+            if self._spill is None:
+                self._spill = open(self.spill_path, 'ab')
+            self._spill.write(block[:, :count].T.tobytes())
+        block[:, :held - count] = block[:, count:held]
+        self.spilled += count
+
+    def history(self, name: str) -> np.ndarray:
+        '''
+        Every value of a column since the store was cleared, read back from
+        the spill file. Without one, dropped packets are not included.
+        '''
+        column = self[name]
+        if self._spill is None:
+            return column.copy()
+        self._spill.flush()
+        spilled = np.fromfile(self.spill_path, dtype=np.float64).reshape(-1, len(self.names))
+        return np.concatenate((spilled[-self.spilled:, self._rows[name]], column))
+
+    def decimate(self, x: str, *y: str, first: int = 0, last: int = None, points: int = POINTS) -> tuple:
+        '''
+        Columns y against column x over the packets first to last (positions
+        in the session, the newest is len(store) - 1) in at most about
+        `points` points. Ranges that would need more are drawn from the min/max
+        buckets of the pyramid, the newest packets always as they are.
+        Returns x and every y as arrays.
+        '''
+        if self._staged:
+            self._flush()
+        last = self.length if last is None else min(last, self.length)
+        rows = [self._rows[name] for name in y]
+        row = self._rows[x]
+        xs = []
+        ys = [[] for _ in y]
+        for depth, begin, end in self.pyramid.cover(max(first, 0), last, points, self.spilled):
+            if depth == 0:
+                xs.append(self._block[row, begin - self.spilled:end - self.spilled])
+                for values, column in zip(ys, rows):
+                    values.append(self._block[column, begin - self.spilled:end - self.spilled])
+            else:
+                segment, columns = self.pyramid.points(depth, begin, end, row, rows)
+                xs.append(segment)
+                for values, column in zip(ys, columns):
+                    values.append(column)
+        if not xs:
+            return (np.empty(0),) + tuple(np.empty(0) for _ in y)
+        return (np.concatenate(xs),) + tuple(np.concatenate(values) for values in ys)
+
+    def span(self, name: str, low: float, high: float) -> tuple:
+        '''
+        Positions first, last of the packets whose column name lies between
+        low and high, with one more on each side so lines reach the edges.
+        The column must be ascending. Spilled packets are only known to come
+        before the ones in memory, a range reaching them starts at 0.
+        '''
+        column = self[name]
+        begin, end = np.searchsorted(column, (low, high))
+        first = self.spilled + begin - 1 if begin else 0
+        return max(first, 0), self.spilled + min(end + 1, len(column))
+
+    def clear(self):
+        self.close()
+        self._block = np.empty((len(self.names), self._capacity))
+        self.pyramid = MinMaxPyramid(len(self.names))
+        self._staged = []
+        self.length = 0
+        self.spilled = 0
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    @property
+    def nbytes(self):
+        if self._staged:
+            self._flush()
+        return self._block.nbytes
+
+    def snapshot(self) -> dict:
+        '''
+        Copy of every column, spilled packets included.
+        '''
+        return {name: self.history(name) for name in self.names}
+
+    def save(self, path: str):
+        np.savez(path, **self.snapshot())
@@ -0,0 +1,164 @@
+import heapq
+import threading
+import time
+
+from lib.logger import logger
+from lib.metrics import Histogram
+
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+
+class Command:
+    __slots__ = ('priority', 'sequence', 'text', 'echo',
+                 'attempts', 'submitted_at', 'sent_at')
+
+    def __init__(self, priority: int, sequence: int, text: str, echo: str = None):
+        self.priority = priority
+        self.sequence = sequence
+        self.text = text
+        self.echo = echo
+        self.attempts = 0
+        self.submitted_at = time.monotonic()
+        self.sent_at = None
+
+    def __lt__(self, other):
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class UplinkQueue:
+    '''
+    Sends commands from a worker thread, most urgent first, paced so the
+    radio's serial buffer (buffer_size bytes, drained at drain_rate bytes/s)
+    never overflows. A command counts as received once a container packet
+    echoes it in CMD_ECHO and is sent again when no echo arrives within
+    ack_timeout seconds.
+
+    CMD_ECHO only holds the last command, so resending the command that is
+    already echoed is acknowledged by the next container packet. Low priority
+    commands (SIMP) are never resent, a stale pressure sample is useless.
+    '''
+
+    def __init__(self, write, buffer_size: int = 256, drain_rate: float = 1000.0,
+                 ack_timeout: float = 3.0, max_attempts: int = 3):
+        self.write = write
+        self.buffer_size = buffer_size
+        self.drain_rate = drain_rate
+        self.ack_timeout = ack_timeout
+        self.max_attempts = max_attempts
+        self.latency = Histogram()  # round trip in milliseconds
+        self.acknowledged = 0
+        self.failed = 0
+        self._queue = []
+        self._awaiting = {}  # echo -> Command
+        self._sequence = 0
+        self._buffer_fill = 0.0
+        self._last_write = time.monotonic()
+        self._running = True
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def priorityOf(command: str):
+        if command == 'SIMP':
+            return LOW
+        if command == 'SIM':
+            return NORMAL
+        return HIGH
+
+    def submit(self, text: str, echo: str = None, priority: int = HIGH):
+        with self._condition:
+            self._sequence += 1
+            heapq.heappush(self._queue, Command(
+                priority, self._sequence, text, echo))
+            self._condition.notify()
+
+    def acknowledge(self, echo: str):
+        '''
+        Called with the CMD_ECHO field of every healthy container packet.
+        '''
+        with self._condition:
+            command = self._awaiting.pop(echo, None)
+        if command is None:
+            return
+        round_trip = time.monotonic() - command.submitted_at
+        self.latency.record(int(round_trip * 1000))
+        self.acknowledged += 1
+        logger.info(
+            f'Command {echo} acknowledged after {round_trip * 1000:.0f} ms ({command.attempts} sent)')
+
+    def _expire(self, now: float):
+        for echo, command in list(self._awaiting.items()):
+            if now - command.sent_at < self.ack_timeout:
+                continue
+            del self._awaiting[echo]
+            if command.priority == LOW:
+                # Simulated pressure is superseded by the next sample, never resent
+                self.failed += 1
+            elif command.attempts < self.max_attempts:
+                logger.warning(
+                    f'No echo for {echo}, retrying ({command.attempts}/{self.max_attempts})')
+                heapq.heappush(self._queue, command)
+            else:
+                logger.error(
+                    f'Command {echo} not acknowledged after {command.attempts} attempts')
+                self.failed += 1
+
+    def _next(self):
+        '''
+        Wait until a command may be written, return None when stopped.
+        '''
+        with self._condition:
+            while self._running:
+                now = time.monotonic()
+                self._expire(now)
+                self._buffer_fill = max(
+                    0.0, self._buffer_fill - (now - self._last_write) * self.drain_rate)
+                self._last_write = now
+                timeout = 0.5
+                if self._awaiting:
+                    timeout = min(timeout, min(command.sent_at for command in self._awaiting.values())
+                                  + self.ack_timeout - now)
+                if self._queue:
+                    command = self._queue[0]
+                    overflow = self._buffer_fill + \
+                        len(command.text) - self.buffer_size
+                    if overflow <= 0 or self._buffer_fill == 0:
+                        heapq.heappop(self._queue)
+                        self._buffer_fill += len(command.text)
+                        return command
+                    timeout = min(timeout, overflow / self.drain_rate)
+                self._condition.wait(max(timeout, 0.001))
+
+    def _run(self):
+        while True:
+            command = self._next()
+            if command is None:
+                return
+            with self._condition:
+                command.attempts += 1
+                command.sent_at = time.monotonic()
+                if command.echo is not None:
+                    self._awaiting[command.echo] = command
+            self.write(command.text)
+            logger.info(f'Outgoing telemetry: {command.text}')
+
+    def snapshot(self):
+        return {
+            'queued': len(self._queue),
+            'awaiting_echo': len(self._awaiting),
+            'acknowledged': self.acknowledged,
+            'failed': self.failed,
+            'round_trip_ms': {
+                'p50': self.latency.percentile(50),
+                'p99': self.latency.percentile(99),
+                'max': self.latency.max,
+            },
+        }
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
@@ -0,0 +1,103 @@
+'''
+Frame integrity checks run on the telemetry worker before a frame reaches
+the GUI. Every frame is classified as healthy, checksum failed, truncated
+or malformed. Healthy frames are decoded into records of lib/schema.py,
+binary frames (struct values from lib/binary.py) without going through
+their CSV text.
+
+With checksums enabled, ASCII frames end with '*' and 4 hex digits: the
+CRC-16/CCITT (initial value 0xFFFF) of the text before the '*'.
+'''
+
+import binascii
+
+from lib.binary import toFields, toRecord
+from lib.schema import SCHEMAS
+
+HEALTHY = 'healthy'
+CHECKSUM_FAILED = 'checksum failed'
+TRUNCATED = 'truncated'
+MALFORMED = 'malformed'
+
+
+def crc(text: str) -> int:
+    return binascii.crc_hqx(text.encode('ascii', 'replace'), 0xFFFF)
+
+
+def appendChecksum(text: str) -> str:
+    '''
+    Add the checksum suffix to a frame (for simulators and tests).
+    '''
+    return f'{text}*{crc(text):04X}'
+
+
+class Frame:
+    '''
+    A received frame, its comma-separated fields, its classification and
+    the RSSI (-dBm) it was received with, if the radio reports one.
+    Healthy frames also carry their decoded record.
+    '''
+    __slots__ = ('data', 'fields', 'status', 'rssi', 'record')
+
+    def __init__(self, data: str, fields: list, status: str, rssi: int = None, record=None):
+        self.data = data
+        self.fields = fields
+        self.status = status
+        self.rssi = rssi
+        self.record = record
+
+    @property
+    def packet_type(self):
+        return self.fields[3] if len(self.fields) > 3 else None
+
+    @property
+    def healthy(self):
+        return self.status == HEALTHY
+
+    def __repr__(self):
+        return f'Frame({self.data!r}, {self.status})'
+
+
+class FrameValidator:
+    def __init__(self, checksum: bool = False):
+        self.checksum = checksum
+        self.counts = {HEALTHY: 0, CHECKSUM_FAILED: 0,
+                       TRUNCATED: 0, MALFORMED: 0}
+
+    def classify(self, data) -> Frame:
+        frame = self._classifyBinary(data) if type(data) is tuple else self._classify(data)
+        self.counts[frame.status] += 1
+        return frame
+
+    def _classify(self, data: str) -> Frame:
+        if self.checksum:
+            text, separator, suffix = data.rpartition('*')
+            try:
+                valid = separator and int(suffix, 16) == crc(text)
+            except ValueError:
+                valid = False
+            if not valid:
+                return Frame(data, data.split(','), CHECKSUM_FAILED)
+            data = text
+        fields = data.split(',')
+        if len(fields) < 4:
+            return Frame(data, fields, TRUNCATED)
+        schema = SCHEMAS.get(fields[3])
+        if schema is None:
+            return Frame(data, fields, MALFORMED)
+        if len(fields) < len(schema):
+            return Frame(data, fields, TRUNCATED)
+        try:
+            record = schema.decode(fields)
+        except ValueError:
+            return Frame(data, fields, MALFORMED)
+        return Frame(data, fields, HEALTHY, record=record)
+
+    def _classifyBinary(self, values: tuple) -> Frame:
+        # The checksum was verified by the BinaryFramer already
+        fields = toFields(values)
+        try:
+            record = toRecord(values)
+        except ValueError:
+            return Frame(','.join(fields), fields, MALFORMED)
+        return Frame(','.join(fields), fields, HEALTHY, record=record)
@@ -0,0 +1,306 @@
+'''
+Virtual radio for load testing the ground station without an XBee (POSIX only).
+
+A pseudo-terminal is linked as ttyVIRTUAL<n> in the temp directory, where
+Port.list() finds it and Port.connect() opens it like a real device. The radio
+streams container (C) and payload (T) packets of a simulated flight in the
+exact CSV layouts of updateContainer/updatePayload, answers uplink commands
+through CMD_ECHO and can inject corruption, bursts and drops. With --xbee
+the radio talks XBee API mode 2 like a local XBee would, with an RSSI that
+degrades with altitude.
+
+Writes never block. When the port reader thread cannot keep up, the pty
+input queue fills and packets are counted as overruns, so ramping the rate up
+until overruns appear gives the reader thread capacity. The GUI thread is
+behind a queued signal and can fall behind without any overrun, its cost per
+packet is measured by benchmarks/guithread.py:
+
+    python -m lib.virtualradio --rate 10
+    python -m lib.virtualradio --ramp 50:500:50 --step-seconds 10
+'''
+
+import argparse
+import math
+import os
+import random
+import time
+import tty
+
+from lib.binary import encode
+from lib.discovery import VIRTUAL_PORT_PATTERN
+from lib.logger import logger
+from lib.validation import appendChecksum
+from lib.xbee import rxPacket
+from settings import TEAM_ID
+
+APOGEE = 725.0
+PARADEPLOY_ALTITUDE = 400.0
+TPDEPLOY_ALTITUDE = 300.0
+XBEE_PAYLOAD = 100  # bytes per RF packet, longer frames span several
+
+
+class VirtualRadio:
+    def __init__(self, payload_rate: float = 4.0, container_rate: float = 1.0, corrupt: float = 0.0,
+                 drop: float = 0.0, burst: int = 0, burst_interval: float = 5.0,
+                 binary: bool = False, checksum: bool = False, seed: int = None, xbee: bool = False):
+        self.payload_rate = payload_rate
+        self.container_rate = container_rate
+        self.corrupt = corrupt
+        self.drop = drop
+        self.burst = burst
+        self.burst_interval = burst_interval
+        self.binary = binary
+        self.checksum = checksum
+        self.xbee = xbee
+        self.altitude = 0.0
+        self.random = random.Random(seed)
+        self.container_count = 0
+        self.payload_count = 0
+        self.cmd_echo = 'CXON'
+        self.sent = 0
+        self.dropped = 0
+        self.corrupted = 0
+        self.overruns = 0
+        self._uplink = bytearray()
+
+        self.master, self.slave = os.openpty()
+        # Raw mode, so \r is not translated and nothing is echoed back
+        tty.setraw(self.slave)
+        os.set_blocking(self.master, False)
+        self.device_name = os.ttyname(self.slave)
+        self.port_name = self._link()
+        self.start_time = time.monotonic()
+
+    def _link(self):
+        index = 0
+        while True:
+            path = VIRTUAL_PORT_PATTERN.replace('*', str(index))
+            try:
+                os.symlink(self.device_name, path)
+                return path
+            except FileExistsError:
+                if not os.path.exists(path):
+                    # Left behind by a radio that did not exit cleanly
+                    os.remove(path)
+                    continue
+                index += 1
+
+    # Simulated flight
+
+    def flight(self, elapsed: float):
+        '''
+        Altitude (m) and container state of a 2 minute flight on a loop.
+        '''
+        t = elapsed % 120
+        if t < 5:
+            return 0.0, 'PRELAUNCH'
+        if t < 15:
+            return APOGEE * math.sin((t - 5) / 10 * math.pi / 2), 'LAUNCH'
+        fall = t - 15
+        free_fall = (APOGEE - PARADEPLOY_ALTITUDE) / 15
+        if fall < free_fall:
+            return APOGEE - fall * 15, 'APOGEE'
+        altitude = PARADEPLOY_ALTITUDE - (fall - free_fall) * 5
+        if altitude > TPDEPLOY_ALTITUDE:
+            return altitude, 'PARADEPLOY'
+        if altitude > 0:
+            return altitude, 'TPDEPLOY'
+        return 0.0, 'LAND'
+
+    @staticmethod
+    def _clock():
+        hours, rest = divmod(time.time() % 86400, 3600)
+        minutes, seconds = divmod(rest, 60)
+        return f'{int(hours):02d}:{int(minutes):02d}:{seconds:05.2f}'
+
+    def containerPacket(self, elapsed: float):
+        self.container_count += 1
+        altitude, state = self.flight(elapsed)
+        self.altitude = altitude
+        released = 'R' if state in ('TPDEPLOY', 'LAND') else 'N'
+        noise = self.random.gauss
+        clock = self._clock()
+        return (f'{TEAM_ID},{clock},{self.container_count},C,F,{released},'
+                f'{altitude + noise(0, 0.3):.1f},{25.3 + noise(0, 0.1):.1f},{7.9 - elapsed / 3600:.2f},'
+                f'{clock[:8]},{13.7304 + noise(0, 1e-4):.4f},{100.7764 + noise(0, 1e-4):.4f},'
+                f'{altitude + noise(0, 2):.1f},8,{state},{self.cmd_echo}')
+
+    def payloadPacket(self, elapsed: float):
+        self.payload_count += 1
+        altitude, state = self.flight(elapsed)
+        tp_state = 'IDLE' if state not in ('TPDEPLOY', 'LAND') else 'DEPLOYED'
+        noise = self.random.gauss
+        return (f'{TEAM_ID},{self._clock()},{self.payload_count},T,{altitude + noise(0, 0.3):.2f},'
+                f'{25.7 + noise(0, 0.1):.2f},{6.26 - elapsed / 7200:.2f},'
+                + ','.join(f'{noise(0, scale):.2f}' for scale in (5, 5, 5, 0.5, 0.5, 9.8, 0.3, 0.3, 0.3))
+                + f',{abs(noise(0, 3)):.2f},{tp_state}')
+
+    # Fault injection and transmission
+
+    def _corrupt(self, frame: bytes):
+        kind = self.random.randrange(3)
+        position = self.random.randrange(len(frame))
+        if kind == 0:
+            # Garbled digit
+            return frame[:position] + bytes((self.random.randrange(33, 127),)) + frame[position + 1:]
+        if kind == 1:
+            # Truncated frame
+            return frame[:position]
+        # Line noise, non-printable and non-ASCII bytes
+        return frame[:position] + bytes(self.random.randrange(128, 256) for _ in range(3)) + frame[position:]
+
+    def frame(self, line: str):
+        if self.binary:
+            return encode(line)
+        if self.checksum:
+            line = appendChecksum(line)
+        data = line.encode('ascii') + b'\r\n'
+        if self.xbee:
+            rssi = min(100, round(40 + self.altitude / 25 + self.random.gauss(0, 2)))
+            return b''.join(rxPacket(data[i:i + XBEE_PAYLOAD], rssi=rssi)
+                            for i in range(0, len(data), XBEE_PAYLOAD))
+        return data
+
+    def transmit(self, lines: list):
+        data = bytearray()
+        sent = 0
+        for line in lines:
+            if self.random.random() < self.drop:
+                self.dropped += 1
+                continue
+            frame = self.frame(line)
+            if self.random.random() < self.corrupt:
+                self.corrupted += 1
+                frame = self._corrupt(frame)
+            data += frame
+            sent += 1
+        if not data:
+            return 0
+        try:
+            written = os.write(self.master, data)
+        except BlockingIOError:
+            written = 0
+        self.sent += sent
+        if written < len(data):
+            # Packets that did not fit into the pty, pro rata
+            self.overruns += max(1, round(sent * (len(data) - written) / len(data)))
+        return written
+
+    def receive(self):
+        '''
+        Read uplink commands and echo them in the next container packets.
+        '''
+        try:
+            self._uplink += os.read(self.master, 4096)
+        except BlockingIOError:
+            return
+        *commands, self._uplink = self._uplink.split(b'\r')
+        self._uplink = bytearray(self._uplink)
+        for command in commands:
+            if self.xbee:
+                # Skip the Transmit Request header, commands are plain ASCII
+                command = command[max(command.rfind(b'CMD,'), 0):]
+            fields = command.strip().decode('ascii', 'replace').split(',')
+            if len(fields) >= 3 and fields[0] == 'CMD':
+                self.cmd_echo = ''.join(fields[2:])
+                logger.info(f'Uplink command: {command.decode("ascii", "replace")}')
+
+    def run(self, duration: float = None):
+        '''
+        Stream packets at the configured rates until duration elapses.
+        '''
+        start = time.monotonic()
+        next_container = next_payload = start
+        next_burst = start + self.burst_interval if self.burst else math.inf
+        while duration is None or time.monotonic() - start < duration:
+            now = time.monotonic()
+            elapsed = now - self.start_time
+            lines = []
+            while self.container_rate and next_container <= now:
+                lines.append(self.containerPacket(elapsed))
+                next_container += 1 / self.container_rate
+            while self.payload_rate and next_payload <= now:
+                lines.append(self.payloadPacket(elapsed))
+                next_payload += 1 / self.payload_rate
+            if next_burst <= now:
+                lines += [self.payloadPacket(elapsed)
+                          for _ in range(self.burst)]
+                next_burst += self.burst_interval
+            if lines:
+                self.transmit(lines)
+            self.receive()
+            wake = min(next_container if self.container_rate else math.inf,
+                       next_payload if self.payload_rate else math.inf, next_burst)
+            time.sleep(max(0.0, min(wake - time.monotonic(), 0.05)))
+
+    def stats(self):
+        return f'{self.sent} packets sent, {self.dropped} dropped, {self.corrupted} corrupted, {self.overruns} overruns'
+
+    def close(self):
+        try:
+            os.remove(self.port_name)
+        except FileNotFoundError:
+            pass
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Stream simulated telemetry through a pseudo-terminal.')
+    parser.add_argument('--rate', type=float, default=4.0,
+                        help='payload packets per second')
+    parser.add_argument('--container-rate', type=float, default=1.0,
+                        help='container packets per second')
+    parser.add_argument('--corrupt', type=float, default=0.0,
+                        help='probability of corrupting a packet')
+    parser.add_argument('--drop', type=float, default=0.0,
+                        help='probability of dropping a packet')
+    parser.add_argument('--burst', type=int, default=0,
+                        help='extra payload packets sent back to back every --burst-interval seconds')
+    parser.add_argument('--burst-interval', type=float, default=5.0)
+    parser.add_argument('--duration', type=float,
+                        help='seconds to run, forever by default')
+    parser.add_argument('--ramp', metavar='START:STOP:STEP',
+                        help='step the payload rate up and report overruns per step')
+    parser.add_argument('--step-seconds', type=float, default=10.0)
+    parser.add_argument('--binary', action='store_true',
+                        help='send packed binary frames')
+    parser.add_argument('--checksum', action='store_true',
+                        help='append CRC suffixes to ASCII frames')
+    parser.add_argument('--xbee', action='store_true',
+                        help='speak XBee API mode 2 (WIRE_FORMAT = \'xbee\')')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    radio = VirtualRadio(args.rate, args.container_rate, args.corrupt, args.drop, args.burst,
+                         args.burst_interval, args.binary, args.checksum, args.seed, args.xbee)
+    logger.info(f'Virtual radio on {radio.port_name} ({radio.device_name})')
+    try:
+        if args.ramp:
+            start, stop, step = map(float, args.ramp.split(':'))
+            input(f'Connect the ground station to {radio.port_name}, then press Enter ')
+            rate = start
+            while rate <= stop:
+                radio.payload_rate = rate
+                sent, overruns = radio.sent, radio.overruns
+                radio.run(args.step_seconds)
+                lost = radio.overruns - overruns
+                logger.info(
+                    f'{rate:.0f} Hz: {radio.sent - sent} packets, {lost} overruns')
+                if lost:
+                    logger.info(
+                        f'Sustainable rate is below {rate:.0f} payload packets per second')
+                    break
+                rate += step
+        else:
+            radio.run(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info(radio.stats())
+        radio.close()
+
+
+if __name__ == '__main__':
+    main()
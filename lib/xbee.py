@@ -0,0 +1,157 @@
+'''
+XBee API mode 2 (AP=2, escaped) framing.
+
+    0x7E | LENGTH (2 bytes, big-endian) | FRAME DATA (LENGTH bytes) | CHECKSUM
+
+After the start delimiter, 0x7E, 0x7D, 0x11 and 0x13 are sent as 0x7D
+followed by the byte XOR 0x20. The checksum is 0xFF minus the low byte of
+the frame data sum, like lib/binary.py. The first frame data byte is the
+frame type. Received data arrives in RX packets:
+
+    0x80  RX 64-bit address: source (8), RSSI (1), options (1), data
+    0x81  RX 16-bit address: source (2), RSSI (1), options (1), data
+    0x90  Receive packet: source (8), network address (2), options (1), data
+
+RSSI is reported as -dBm, e.g. 0x28 is -40 dBm. 0x90 packets carry none.
+Uplink data is sent in 0x10 Transmit Request frames.
+'''
+
+import struct
+
+from lib.binary import checksum
+from lib.logger import logger
+
+START = 0x7E
+ESCAPE = 0x7D
+ESCAPED = frozenset((0x7E, 0x7D, 0x11, 0x13))
+RX_64 = 0x80
+RX_16 = 0x81
+RX = 0x90
+TRANSMIT_REQUEST = 0x10
+BROADCAST = b'\x00\x00\x00\x00\x00\x00\xff\xff'
+
+
+class RxPacket:
+    '''
+    Data of one received RF packet, its source address and RSSI (-dBm).
+    '''
+    __slots__ = ('source', 'rssi', 'data')
+
+    def __init__(self, source: str, rssi: int, data: bytes):
+        self.source = source
+        self.rssi = rssi
+        self.data = data
+
+    def __repr__(self):
+        return f'RxPacket({self.source}, {self.rssi}, {self.data!r})'
+
+
+def escape(data: bytes) -> bytes:
+    escaped = bytearray()
+    for byte in data:
+        if byte in ESCAPED:
+            escaped += bytes((ESCAPE, byte ^ 0x20))
+        else:
+            escaped.append(byte)
+    return bytes(escaped)
+
+
+def unescape(data) -> bytes:
+    '''
+    Undo escaping, a dangling escape byte at the end is dropped.
+    '''
+    first, *rest = bytes(data).split(bytes((ESCAPE,)))
+    return first + b''.join(bytes((part[0] ^ 0x20,)) + part[1:] for part in rest if part)
+
+
+def frame(frame_data: bytes) -> bytes:
+    '''
+    Wrap frame data in an escaped API frame.
+    '''
+    body = struct.pack('>H', len(frame_data)) + frame_data + bytes((checksum(frame_data),))
+    return bytes((START,)) + escape(body)
+
+
+def transmitRequest(data: bytes, destination: bytes = BROADCAST, frame_id: int = 0) -> bytes:
+    '''
+    Transmit Request frame, frame_id 0 disables the TX status response.
+    '''
+    return frame(struct.pack('>BB8sHBB', TRANSMIT_REQUEST, frame_id, destination, 0xFFFE, 0, 0) + data)
+
+
+def rxPacket(data: bytes, source: bytes = b'\x00\x13\xa2\x00\x00\x00\x00\x01', rssi: int = 40) -> bytes:
+    '''
+    RX 64-bit address frame as sent by a receiving radio (for simulators and tests).
+    '''
+    return frame(struct.pack('>B8sBB', RX_64, source, rssi, 0) + data)
+
+
+def parse(frame_data: bytes):
+    '''
+    RxPacket of an RX frame, None for any other frame type.
+    '''
+    if not frame_data:
+        return None
+    frame_type = frame_data[0]
+    if frame_type == RX_64 and len(frame_data) >= 11:
+        return RxPacket(frame_data[1:9].hex(), frame_data[9], frame_data[11:])
+    if frame_type == RX_16 and len(frame_data) >= 5:
+        return RxPacket(frame_data[1:3].hex(), frame_data[3], frame_data[5:])
+    if frame_type == RX and len(frame_data) >= 12:
+        return RxPacket(frame_data[1:9].hex(), None, frame_data[12:])
+    return None
+
+
+class XBeeFramer:
+    '''
+    Reassembles API frames from arbitrary chunks of the serial stream. Bytes
+    before a start delimiter, frames cut short by the next delimiter and
+    frames failing their checksum are dropped.
+    '''
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.checksum_errors = 0
+        self.discarded_bytes = 0
+        self.other_frames = 0
+
+    def feed(self, chunk: bytes) -> list:
+        '''
+        Append a chunk and return an RxPacket for every complete RX frame.
+        '''
+        buffer = self.buffer
+        buffer += chunk
+        packets = []
+        position = 0
+        while True:
+            start = buffer.find(START, position)
+            if start < 0:
+                self.discarded_bytes += len(buffer) - position
+                position = len(buffer)
+                break
+            self.discarded_bytes += start - position
+            # Escaping guarantees the next 0x7E starts the next frame
+            stop = buffer.find(START, start + 1)
+            body = unescape(buffer[start + 1:stop if stop >= 0 else len(buffer)])
+            length = int.from_bytes(body[:2], 'big') if len(body) >= 2 else None
+            if length is None or len(body) < length + 3:
+                if stop < 0:
+                    position = start
+                    break
+                logger.warning('Dropping truncated XBee frame')
+                self.checksum_errors += 1
+                position = stop
+                continue
+            position = stop if stop >= 0 else len(buffer)
+            frame_data = body[2:length + 2]
+            if checksum(frame_data) != body[length + 2]:
+                logger.warning('Dropping XBee frame with bad checksum')
+                self.checksum_errors += 1
+                continue
+            packet = parse(frame_data)
+            if packet is None:
+                self.other_frames += 1
+            else:
+                packets.append(packet)
+        del buffer[:position]
+        return packets
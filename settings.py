@@ -1,2 +1,13 @@
 TEAM_ID = 1022
 PACKET_COUNT_ORIGIN = 'remote'  # 'local' or 'remote', use 'remote' in production
+TELEMETRY_TRANSPORT = 'thread'  # 'thread' or 'asyncio' (needs qasync, POSIX only)
+BACKUP_PORTS = []  # receive-only backup radios merged with the selected port, e.g. ['COM11']
+HISTORY_RETENTION = {'C': 3600, 'T': 14400}  # packets of each stream kept in memory for the charts, older ones spill to logs/<time>_<type>_history.f64, None keeps them all in memory
+RENDER_RATE = 25  # Hz, charts and value labels are repainted at most this often, 0 repaints after every batch of packets
+CHART_SPAN = None  # newest packets of each stream shown by the charts, None shows the whole session
+CHART_POINTS = 1000  # points drawn per series at most (about), longer spans are min/max decimated
+REORDER_WINDOW = 8  # packets of each stream (C, T) held back to release them in PACKET_COUNT order, 0 passes them on as they come
+WIRE_FORMAT = 'ascii'  # 'ascii' (CSV frames), 'binary' (packed frames, see lib/binary.py) or 'xbee' (CSV frames in XBee API mode 2, see lib/xbee.py)
+FRAME_CHECKSUM = False  # ASCII frames end with *XXXX, the CRC-16/CCITT of the text before it
+RAW_JOURNAL = False  # tee the raw bytes of every radio into logs/<time>_<port>.journal, replay with python -m lib.journal
+LOW_LATENCY_SERIAL = False  # Linux only, sets ASYNC_LOW_LATENCY and a 1 ms FTDI latency timer (needs write access to sysfs)
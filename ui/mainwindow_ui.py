@@ -3,7 +3,7 @@
 ################################################################################
 ## Form generated from reading UI file 'main.ui'
 ##
-## Created by: Qt User Interface Compiler version 6.3.0
+## Created by: Qt User Interface Compiler version 6.8.3
 ##
 ## WARNING! All changes made in this file will be lost when recompiling UI file!
 ################################################################################
@@ -153,7 +153,7 @@ class Ui_MainWindow(object):
         self.horizontalLayout_28.setObjectName(u"horizontalLayout_28")
         self.mission_time = QLabel(self.config_box)
         self.mission_time.setObjectName(u"mission_time")
-        sizePolicy = QSizePolicy(QSizePolicy.Preferred, QSizePolicy.Preferred)
+        sizePolicy = QSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Preferred)
         sizePolicy.setHorizontalStretch(0)
         sizePolicy.setVerticalStretch(0)
         sizePolicy.setHeightForWidth(self.mission_time.sizePolicy().hasHeightForWidth())
@@ -208,7 +208,7 @@ class Ui_MainWindow(object):
 
         self.port_refresh_button = QPushButton(self.config_box)
         self.port_refresh_button.setObjectName(u"port_refresh_button")
-        sizePolicy1 = QSizePolicy(QSizePolicy.Preferred, QSizePolicy.Fixed)
+        sizePolicy1 = QSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Fixed)
         sizePolicy1.setHorizontalStretch(0)
         sizePolicy1.setVerticalStretch(0)
         sizePolicy1.setHeightForWidth(self.port_refresh_button.sizePolicy().hasHeightForWidth())
@@ -277,12 +277,12 @@ class Ui_MainWindow(object):
         self.line_5.setObjectName(u"line_5")
         self.line_5.setStyleSheet(u"background-color: rgb(62, 123, 250);\n"
 "border-radius: 100px;")
-        self.line_5.setFrameShape(QFrame.VLine)
-        self.line_5.setFrameShadow(QFrame.Sunken)
+        self.line_5.setFrameShape(QFrame.Shape.VLine)
+        self.line_5.setFrameShadow(QFrame.Shadow.Sunken)
 
         self.horizontalLayout_18.addWidget(self.line_5)
 
-        self.horizontalSpacer_7 = QSpacerItem(10, 20, QSizePolicy.Fixed, QSizePolicy.Minimum)
+        self.horizontalSpacer_7 = QSpacerItem(10, 20, QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Minimum)
 
         self.horizontalLayout_18.addItem(self.horizontalSpacer_7)
 
@@ -321,7 +321,7 @@ class Ui_MainWindow(object):
 
         self.horizontalLayout.addWidget(self.sats_value)
 
-        self.horizontalSpacer_2 = QSpacerItem(40, 20, QSizePolicy.Preferred, QSizePolicy.Minimum)
+        self.horizontalSpacer_2 = QSpacerItem(40, 20, QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Minimum)
 
         self.horizontalLayout.addItem(self.horizontalSpacer_2)
 
@@ -338,7 +338,7 @@ class Ui_MainWindow(object):
 
         self.horizontalLayout.addWidget(self.lat_value)
 
-        self.horizontalSpacer_3 = QSpacerItem(20, 20, QSizePolicy.Preferred, QSizePolicy.Minimum)
+        self.horizontalSpacer_3 = QSpacerItem(20, 20, QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Minimum)
 
         self.horizontalLayout.addItem(self.horizontalSpacer_3)
 
@@ -363,7 +363,7 @@ class Ui_MainWindow(object):
 
         self.container_box = QWidget(self.centralwidget)
         self.container_box.setObjectName(u"container_box")
-        sizePolicy2 = QSizePolicy(QSizePolicy.Preferred, QSizePolicy.Expanding)
+        sizePolicy2 = QSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Expanding)
         sizePolicy2.setHorizontalStretch(0)
         sizePolicy2.setVerticalStretch(0)
         sizePolicy2.setHeightForWidth(self.container_box.sizePolicy().hasHeightForWidth())
@@ -389,12 +389,12 @@ class Ui_MainWindow(object):
         self.line_2.setMaximumSize(QSize(16777215, 25))
         self.line_2.setStyleSheet(u"background-color: rgb(62, 123, 250);\n"
 "border-radius: 100px;")
-        self.line_2.setFrameShape(QFrame.VLine)
-        self.line_2.setFrameShadow(QFrame.Sunken)
+        self.line_2.setFrameShape(QFrame.Shape.VLine)
+        self.line_2.setFrameShadow(QFrame.Shadow.Sunken)
 
         self.horizontalLayout_4.addWidget(self.line_2)
 
-        self.horizontalSpacer = QSpacerItem(10, 20, QSizePolicy.Fixed, QSizePolicy.Minimum)
+        self.horizontalSpacer = QSpacerItem(10, 20, QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Minimum)
 
         self.horizontalLayout_4.addItem(self.horizontalSpacer)
 
@@ -449,7 +449,7 @@ class Ui_MainWindow(object):
         self.horizontalLayout_7.setObjectName(u"horizontalLayout_7")
         self.c_battery_visual = QProgressBar(self.widget)
         self.c_battery_visual.setObjectName(u"c_battery_visual")
-        sizePolicy3 = QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        sizePolicy3 = QSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
         sizePolicy3.setHorizontalStretch(0)
         sizePolicy3.setVerticalStretch(0)
         sizePolicy3.setHeightForWidth(self.c_battery_visual.sizePolicy().hasHeightForWidth())
@@ -495,7 +495,7 @@ class Ui_MainWindow(object):
         self.pkg_count_box = QGroupBox(self.container_box)
         self.pkg_count_box.setObjectName(u"pkg_count_box")
         self.pkg_count_box.setMinimumSize(QSize(214, 40))
-        self.pkg_count_box.setMaximumSize(QSize(400, 31))
+        self.pkg_count_box.setMaximumSize(QSize(600, 31))
         self.horizontalLayout_5 = QHBoxLayout(self.pkg_count_box)
         self.horizontalLayout_5.setObjectName(u"horizontalLayout_5")
         self.pkg_count_label_3 = QLabel(self.pkg_count_box)
@@ -526,6 +526,20 @@ class Ui_MainWindow(object):
 
         self.horizontalLayout_5.addWidget(self.c_corrupted_pkg_count)
 
+        self.pkg_count_label_4 = QLabel(self.pkg_count_box)
+        self.pkg_count_label_4.setObjectName(u"pkg_count_label_4")
+        self.pkg_count_label_4.setFont(font5)
+        self.pkg_count_label_4.setStyleSheet(u"color: #8f90a6;")
+
+        self.horizontalLayout_5.addWidget(self.pkg_count_label_4)
+
+        self.c_lost_pkg_count = QLabel(self.pkg_count_box)
+        self.c_lost_pkg_count.setObjectName(u"c_lost_pkg_count")
+        self.c_lost_pkg_count.setFont(font6)
+        self.c_lost_pkg_count.setStyleSheet(u"color: #fdac42;")
+
+        self.horizontalLayout_5.addWidget(self.c_lost_pkg_count)
+
 
         self.verticalLayout_6.addWidget(self.pkg_count_box)
 
@@ -538,7 +552,7 @@ class Ui_MainWindow(object):
         self.gridLayout_2.setObjectName(u"gridLayout_2")
         self.c_voltage_chart = PlotWidget(self.chart_box)
         self.c_voltage_chart.setObjectName(u"c_voltage_chart")
-        sizePolicy4 = QSizePolicy(QSizePolicy.Preferred, QSizePolicy.MinimumExpanding)
+        sizePolicy4 = QSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.MinimumExpanding)
         sizePolicy4.setHorizontalStretch(0)
         sizePolicy4.setVerticalStretch(0)
         sizePolicy4.setHeightForWidth(self.c_voltage_chart.sizePolicy().hasHeightForWidth())
@@ -585,7 +599,7 @@ class Ui_MainWindow(object):
         self.horizontalLayout_3.setObjectName(u"horizontalLayout_3")
         self.c_temp_label = QLabel(self.widget_8)
         self.c_temp_label.setObjectName(u"c_temp_label")
-        sizePolicy5 = QSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.Minimum)
+        sizePolicy5 = QSizePolicy(QSizePolicy.Policy.MinimumExpanding, QSizePolicy.Policy.Minimum)
         sizePolicy5.setHorizontalStretch(0)
         sizePolicy5.setVerticalStretch(0)
         sizePolicy5.setHeightForWidth(self.c_temp_label.sizePolicy().hasHeightForWidth())
@@ -598,7 +612,7 @@ class Ui_MainWindow(object):
 
         self.c_temp_value = QLabel(self.widget_8)
         self.c_temp_value.setObjectName(u"c_temp_value")
-        sizePolicy6 = QSizePolicy(QSizePolicy.Minimum, QSizePolicy.Minimum)
+        sizePolicy6 = QSizePolicy(QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Minimum)
         sizePolicy6.setHorizontalStretch(0)
         sizePolicy6.setVerticalStretch(0)
         sizePolicy6.setHeightForWidth(self.c_temp_value.sizePolicy().hasHeightForWidth())
@@ -726,12 +740,12 @@ class Ui_MainWindow(object):
         self.line_7.setObjectName(u"line_7")
         self.line_7.setStyleSheet(u"background-color: rgb(62, 123, 250);\n"
 "border-radius: 100px;")
-        self.line_7.setFrameShape(QFrame.VLine)
-        self.line_7.setFrameShadow(QFrame.Sunken)
+        self.line_7.setFrameShape(QFrame.Shape.VLine)
+        self.line_7.setFrameShadow(QFrame.Shadow.Sunken)
 
         self.horizontalLayout_19.addWidget(self.line_7)
 
-        self.horizontalSpacer_9 = QSpacerItem(10, 20, QSizePolicy.Fixed, QSizePolicy.Minimum)
+        self.horizontalSpacer_9 = QSpacerItem(10, 20, QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Minimum)
 
         self.horizontalLayout_19.addItem(self.horizontalSpacer_9)
 
@@ -950,12 +964,12 @@ class Ui_MainWindow(object):
         self.line_6.setMaximumSize(QSize(16777215, 25))
         self.line_6.setStyleSheet(u"background-color: rgb(62, 123, 250);\n"
 "border-radius: 100px;")
-        self.line_6.setFrameShape(QFrame.VLine)
-        self.line_6.setFrameShadow(QFrame.Sunken)
+        self.line_6.setFrameShape(QFrame.Shape.VLine)
+        self.line_6.setFrameShadow(QFrame.Shadow.Sunken)
 
         self.horizontalLayout_20.addWidget(self.line_6)
 
-        self.horizontalSpacer_8 = QSpacerItem(10, 20, QSizePolicy.Fixed, QSizePolicy.Minimum)
+        self.horizontalSpacer_8 = QSpacerItem(10, 20, QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Minimum)
 
         self.horizontalLayout_20.addItem(self.horizontalSpacer_8)
 
@@ -1089,7 +1103,7 @@ class Ui_MainWindow(object):
         self.pkg_count_box_2 = QGroupBox(self.payload_box)
         self.pkg_count_box_2.setObjectName(u"pkg_count_box_2")
         self.pkg_count_box_2.setMinimumSize(QSize(214, 40))
-        self.pkg_count_box_2.setMaximumSize(QSize(400, 31))
+        self.pkg_count_box_2.setMaximumSize(QSize(600, 31))
         self.horizontalLayout_17 = QHBoxLayout(self.pkg_count_box_2)
         self.horizontalLayout_17.setObjectName(u"horizontalLayout_17")
         self.pkg_count_label_7 = QLabel(self.pkg_count_box_2)
@@ -1120,6 +1134,20 @@ class Ui_MainWindow(object):
 
         self.horizontalLayout_17.addWidget(self.p_corrupted_pkg_count)
 
+        self.pkg_count_label_9 = QLabel(self.pkg_count_box_2)
+        self.pkg_count_label_9.setObjectName(u"pkg_count_label_9")
+        self.pkg_count_label_9.setFont(font5)
+        self.pkg_count_label_9.setStyleSheet(u"color: #8f90a6;")
+
+        self.horizontalLayout_17.addWidget(self.pkg_count_label_9)
+
+        self.p_lost_pkg_count = QLabel(self.pkg_count_box_2)
+        self.p_lost_pkg_count.setObjectName(u"p_lost_pkg_count")
+        self.p_lost_pkg_count.setFont(font6)
+        self.p_lost_pkg_count.setStyleSheet(u"color: #fdac42;")
+
+        self.horizontalLayout_17.addWidget(self.p_lost_pkg_count)
+
 
         self.verticalLayout_5.addWidget(self.pkg_count_box_2)
 
@@ -1462,13 +1490,13 @@ class Ui_MainWindow(object):
         self.stage_title.setFont(font16)
         self.horizontalLayout_2 = QHBoxLayout(self.stage_title)
         self.horizontalLayout_2.setObjectName(u"horizontalLayout_2")
-        self.horizontalSpacer_4 = QSpacerItem(47, 20, QSizePolicy.Preferred, QSizePolicy.Minimum)
+        self.horizontalSpacer_4 = QSpacerItem(47, 20, QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Minimum)
 
         self.horizontalLayout_2.addItem(self.horizontalSpacer_4)
 
         self.label_3 = QLabel(self.stage_title)
         self.label_3.setObjectName(u"label_3")
-        sizePolicy7 = QSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.Preferred)
+        sizePolicy7 = QSizePolicy(QSizePolicy.Policy.MinimumExpanding, QSizePolicy.Policy.Preferred)
         sizePolicy7.setHorizontalStretch(0)
         sizePolicy7.setVerticalStretch(0)
         sizePolicy7.setHeightForWidth(self.label_3.sizePolicy().hasHeightForWidth())
@@ -1499,7 +1527,7 @@ class Ui_MainWindow(object):
 
         self.horizontalLayout_2.addWidget(self.label_4)
 
-        self.horizontalSpacer_5 = QSpacerItem(7, 20, QSizePolicy.Preferred, QSizePolicy.Minimum)
+        self.horizontalSpacer_5 = QSpacerItem(7, 20, QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Minimum)
 
         self.horizontalLayout_2.addItem(self.horizontalSpacer_5)
 
@@ -1736,6 +1764,8 @@ class Ui_MainWindow(object):
         self.c_healthy_pkg_count.setText(QCoreApplication.translate("MainWindow", u"0", None))
         self.pkg_count_label_2.setText(QCoreApplication.translate("MainWindow", u"Corrupted Packets:", None))
         self.c_corrupted_pkg_count.setText(QCoreApplication.translate("MainWindow", u"0", None))
+        self.pkg_count_label_4.setText(QCoreApplication.translate("MainWindow", u"Lost Packets:", None))
+        self.c_lost_pkg_count.setText(QCoreApplication.translate("MainWindow", u"0", None))
         self.c_temp_label.setText(QCoreApplication.translate("MainWindow", u"Temperature:", None))
         self.c_temp_value.setText(QCoreApplication.translate("MainWindow", u"N/A", None))
         self.c_altitude_label.setText(QCoreApplication.translate("MainWindow", u"Altitude:", None))
@@ -1780,6 +1810,8 @@ class Ui_MainWindow(object):
         self.p_healthy_pkg_count.setText(QCoreApplication.translate("MainWindow", u"0", None))
         self.pkg_count_label_8.setText(QCoreApplication.translate("MainWindow", u"Corrupted Packets:", None))
         self.p_corrupted_pkg_count.setText(QCoreApplication.translate("MainWindow", u"0", None))
+        self.pkg_count_label_9.setText(QCoreApplication.translate("MainWindow", u"Lost Packets:", None))
+        self.p_lost_pkg_count.setText(QCoreApplication.translate("MainWindow", u"0", None))
         self.p_temp_label.setText(QCoreApplication.translate("MainWindow", u"Temperature:", None))
         self.p_temp_value.setText(QCoreApplication.translate("MainWindow", u"N/A", None))
         self.p_gyro_label.setText(QCoreApplication.translate("MainWindow", u"Gyroscope:", None))